@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+from flight_records import RecordBatch
+from lru import LRUCache
+from parse_cache import DiskCache, tiered_stats
+
+# Cache das análises abertas recentemente (RecordBatch já descodificado), limitada por um orçamento
+# aproximado de memória. Com ANALYSIS_CACHE_DIR as análises também ficam em disco (comprimidas),
+# numa pasta partilhada pelos workers do gunicorn da mesma máquina.
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+ANALYSIS_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR')
+ANALYSIS_CACHE_DISK_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_DISK_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+
+
+class AnalysisCache:
+    """Registos de cada análise por (upload ID, versão do conteúdo), com despejo LRU por bytes.
+
+    A versão entra na chave: uma análise acrescentada noutro worker tem outra versão e nunca é servida
+    desatualizada; invalidate() só liberta a memória e o disco mais cedo. O RecordIndex da pesquisa fica
+    na mesma entrada (put_index) e conta para o mesmo orçamento. Os lotes devolvidos são partilhados e
+    não devem ser alterados.
+    """
+
+    def __init__(self, max_bytes=ANALYSIS_CACHE_MAX_BYTES, disk_dir=ANALYSIS_CACHE_DIR, disk_max_bytes=ANALYSIS_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.memory = LRUCache(max_bytes=max_bytes)  # upload_id -> (versão, lote, bytes do lote, índice ou None)
+        self.disk = DiskCache(disk_dir, disk_max_bytes) if disk_dir else None
+        self.disk_hits = 0
+
+    @staticmethod
+    def _disk_key(upload_id, version):
+        return f"{upload_id}-{version}"
+
+    def get(self, upload_id, version):
+        entry = self.memory.get(upload_id, valid=lambda entry: entry[0] == version)
+        if entry is not None:
+            return entry[1]
+        if self.disk:
+            data = self.disk.get(self._disk_key(upload_id, version))
+            if data is not None:
+                batch = RecordBatch.unpack(data)
+                self.disk_hits += 1
+                self._remember(upload_id, version, batch)
+                return batch
+        return None
+
+    def put(self, upload_id, version, batch):
+        self._remember(upload_id, version, batch)
+        if self.disk:
+            self.disk.delete_prefix(f"{upload_id}-")
+            self.disk.put(self._disk_key(upload_id, version), batch.pack())
+
+    def _remember(self, upload_id, version, batch, batch_bytes=None, index=None):
+        batch_bytes = batch_bytes or batch.approx_bytes()
+        if index is not None and self.memory.put(upload_id, (version, batch, batch_bytes, index), batch_bytes + index.approx_bytes()):
+            return
+        # Sem índice (ou se o índice não couber) guarda-se só o lote
+        self.memory.put(upload_id, (version, batch, batch_bytes, None), batch_bytes)
+
+    def get_index(self, upload_id, version):
+        """RecordIndex guardado com a análise por put_index, ou None."""
+        entry = self.memory.peek(upload_id)
+        return entry[3] if entry is not None and entry[0] == version else None
+
+    def put_index(self, upload_id, version, index):
+        entry = self.memory.peek(upload_id)
+        batch_bytes = entry[2] if entry is not None and entry[0] == version and entry[1] is index.batch else None
+        self._remember(upload_id, version, index.batch, batch_bytes, index)
+
+    def invalidate(self, upload_id):
+        self.memory.pop(upload_id)
+        if self.disk:
+            self.disk.delete_prefix(f"{upload_id}-")
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        return tiered_stats(self.memory.stats(), self.disk_hits)
+
+
+# Listagens do histórico (get_uploads) por utilizador, guardadas por poucos segundos: a barra lateral pede a
+# mesma listagem a cada login e depois de cada operação
+UPLOAD_LIST_CACHE_TTL = float(os.environ.get('UPLOAD_LIST_CACHE_TTL', 30))
+UPLOAD_LIST_CACHE_PAGES = int(os.environ.get('UPLOAD_LIST_CACHE_PAGES', 4096))
+
+
+class UploadListCache:
+    """Páginas da listagem de análises de cada utilizador, válidas durante ttl segundos, com despejo LRU.
+
+    save_records, append_records e delete_upload chamam invalidate(); noutro worker a listagem pode ficar
+    desatualizada no máximo ttl segundos.
+    """
+
+    def __init__(self, ttl=UPLOAD_LIST_CACHE_TTL, max_pages=UPLOAD_LIST_CACHE_PAGES):
+        self.ttl = ttl
+        self._entries = LRUCache(max_entries=max_pages)  # (user_id, chave da página) -> (expira em, valor)
+
+    def get(self, user_id, key, now=None):
+        now = now or time.time()
+        entry = self._entries.get((user_id, key), valid=lambda entry: entry[0] > now)
+        return entry[1] if entry is not None else None
+
+    def put(self, user_id, key, value, now=None):
+        self._entries.put((user_id, key), ((now or time.time()) + self.ttl, value))
+
+    def invalidate(self, user_id):
+        self._entries.pop_where(lambda key: key[0] == user_id)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return dict(self._entries.stats(), ttl=self.ttl)
@@ -1,144 +1,203 @@
 # -*- coding: utf-8 -*-
 
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
+import time
+_startup_began = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, g, Response, stream_with_context, make_response
 import re
-from datetime import datetime
-import io
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, auth, firestore
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flight_parser import parse_data_file, iter_decoded_lines, parse_files_parallel
+from flight_records import RecordBatch
+from dashboard import build_dashboard_from_rollups, compute_rollups, merge_rollups
+from auth_layer import require_auth, token_cache
+from record_index import RecordIndex, SEARCH_FIELDS, make_record_filter
+from record_export import iter_csv, iter_parquet, parquet_available
+from storage import STORAGE_BACKEND, AppendConflict, create_storage, in_range
+from parse_cache import ParseCache, hash_stream
+from analysis_cache import AnalysisCache, UploadListCache
+from wire_format import wants_compact, encode_batch, compact_response, preferred_encoding
+import firebase_app
+from firebase_app import get_firestore_client
+import metrics
+from metrics import timed
+
+# NOVO: Tempos das fases de arranque do processo (em segundos); as do Firebase e do armazenamento só
+# aparecem quando são inicializados, no primeiro pedido que precisa deles
+startup_timings = {'imports': round(time.perf_counter() - _startup_began, 4)}
 
 app = Flask(__name__)
-db = None
-try:
-    creds_json_str = os.environ.get('FIREBASE_CREDENTIALS_JSON')
-    if creds_json_str:
-        creds_dict = json.loads(creds_json_str)
-        cred = credentials.Certificate(creds_dict)
-    else:
-        cred_path = 'firebase-credentials.json'
-        if os.path.exists(cred_path):
-            cred = credentials.Certificate(cred_path)
-        else:
-            print("AVISO: Credenciais do Firebase não encontradas.")
-            cred = None
-    
-    # CORREÇÃO: Evita reinicializar a app Firebase, o que pode causar problemas no servidor
-    if cred and not firebase_admin._apps:
-        firebase_admin.initialize_app(cred)
-        db = firestore.client()
-        print("Firebase Admin SDK e Firestore inicializados com sucesso.")
-except Exception as e:
-    print(f"ERRO: Falha ao inicializar o Firebase Admin SDK: {e}")
-
-def parse_data_file(file_content, icao_code):
-    lines = file_content.split('\n')
-    records = []
-    data_date_from_file = None
-    for line in lines:
-        line = line.strip()
-        if not line or len(line) < 25 or re.search(r'\s+(MG|V)\s+\d{4}\s*$', line):
-            continue
-        record = {'timestamp': None, 'matricula': 'N/A', 'tipo_aeronave': 'N/A', 'origem': 'N/A', 'destino': 'N/A', 'regra_voo': 'N/A', 'pista': '', 'responsavel': 'N/A', 'flight_class': 'N/A', 'aerodromo': icao_code}
-        try:
-            date_str_header = line[9:15]
-            data_block = line[15:].strip()
-            route_block = ''
-            match = None
-            patterns = [
-                r'^(?P<matricula>(?:AZU|GLO|TAM)\d{4})(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)', r'^(?P<matricula>FAB\d+)(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)',
-                r'^(?P<matricula>N[A-Z0-9]+)(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)', r'^(?P<matricula>\S+)\s+(?P<tipo>[A-Z0-9]+)\s+(?P<classe>[GSNM])\s+(?P<resto>.*)',
-                r'^(?P<matricula>\S+)\s+(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)',
-            ]
-            for pattern in patterns:
-                match = re.match(pattern, data_block)
-                if match: break
-            if not match: continue
-            g = match.groupdict()
-            record['matricula'] = g['matricula']
-            route_block = g['resto'].strip()
-            if 'tipo_classe' in g:
-                type_class_str = g['tipo_classe']
-                record['tipo_aeronave'] = type_class_str[:-1]; record['flight_class'] = type_class_str[-1]
-            else:
-                record['tipo_aeronave'] = g['tipo']; record['flight_class'] = g['classe']
-            op_match = re.search(r'\s([A-Z]{4})$', route_block)
-            if op_match: record['responsavel'] = op_match.group(1); route_block = route_block[:op_match.start()].strip()
-            pista_match = re.search(r'\s(07|25)$', route_block)
-            if pista_match: record['pista'] = pista_match.group(1); route_block = route_block[:pista_match.start()].strip()
-            rule_match = re.search(r'(IV|VV)', route_block)
-            if rule_match: record['regra_voo'] = 'IFR' if rule_match.group(1) == 'IV' else 'VFR'
-            horario_str = ''; waypoints = []
-            overflight_match = re.search(r'([A-Z0-9]{4}).*?(\d{4}).*?([A-Z0-9]{4})', route_block)
-            if overflight_match:
-                waypoints.extend([overflight_match.group(1), overflight_match.group(3)]); horario_str = overflight_match.group(2)
-            else:
-                single_move_match = re.search(r'([A-Z0-9]{4}).*?(\d{4})', route_block)
-                if single_move_match: waypoints.append(single_move_match.group(1)); horario_str = single_move_match.group(2)
-                else:
-                    time_only_match = re.search(r'(\d{4})', route_block)
-                    if time_only_match: horario_str = time_only_match.group(1)
-            if len(waypoints) >= 2: record['destino'], record['origem'] = waypoints[0], waypoints[1]
-            elif len(waypoints) == 1: record['origem'], record['destino'] = icao_code, waypoints[0]
-            else: record['origem'], record['destino'] = icao_code, icao_code
-            if horario_str:
-                dt_obj = datetime.strptime(f"{date_str_header}{horario_str}", '%d%m%y%H%M')
-                record['timestamp'] = dt_obj.isoformat() + 'Z'
-                if data_date_from_file is None: data_date_from_file = record['timestamp']
-            records.append(record)
-        except Exception as e:
-            print(f"ERRO ao processar linha: '{line.strip()}'. Erro: {e}")
-    return {"records": records, "icao_code": icao_code, "data_date": data_date_from_file}
+# Armazenamento das análises (Firestore ou SQLite local, ver storage.py), inicializado em get_storage()
+storage = None
+storage_initialised = False
+storage_lock = threading.Lock()
+
+# Parsing paralelo de pastas grandes (opcional): número de processos do pool de cada worker web. Por omissão
+# desligado (1): com N workers do gunicorn ficam N pools, por isso o total (N x PARSE_WORKERS) não deve
+# passar do número de CPUs da máquina
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', 1))
+# Tamanho do upload para usar o pool: o modo paralelo lê os ficheiros inteiros para memória antes de os
+# repartir, por isso uploads acima de PARALLEL_PARSE_MAX_BYTES seguem o caminho sequencial, em fluxo
+PARALLEL_PARSE_MIN_BYTES = int(os.environ.get('PARALLEL_PARSE_MIN_BYTES', 8 * 1024 * 1024))
+PARALLEL_PARSE_MAX_BYTES = int(os.environ.get('PARALLEL_PARSE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Paginação de get_records: tamanho por omissão e máximo de uma página
+GET_RECORDS_PAGE_SIZE = 5000
+GET_RECORDS_MAX_PAGE_SIZE = 20000
+# Paginação de get_uploads: máximo de uma página e campos lidos de cada análise (o resto dos metadados não é transferido)
+GET_UPLOADS_MAX_PAGE_SIZE = 200
+UPLOAD_LIST_FIELDS = ('analysisName', 'recordCount', 'startDate', 'endDate', 'status', 'deleteHeartbeat')
+# Consultas por intervalo de datas: número máximo de análises lidas em paralelo
+RANGE_QUERY_MAX_WORKERS = int(os.environ.get('RANGE_QUERY_MAX_WORKERS', 8))
+# Remoção de análises em segundo plano: threads dedicadas
+DELETE_WORKERS = int(os.environ.get('DELETE_WORKERS', 2))
+# Uma remoção sem progresso gravado há mais do que isto (s) é dada como interrompida; um novo DELETE retoma-a
+DELETE_STALL_SECONDS = int(os.environ.get('DELETE_STALL_SECONDS', 300))
+deletion_executor = ThreadPoolExecutor(max_workers=DELETE_WORKERS)
+deletions_in_progress = set()
+deletions_lock = threading.Lock()
+SEARCH_PAGE_SIZE = 100
+# Resultados do parser por conteúdo de ficheiro (ver parse_cache.py)
+parse_cache = ParseCache()
+# Registos das análises abertas recentemente (e os seus índices de pesquisa, ver /api/search_records), para não
+# voltar a lê-los do armazenamento (ver analysis_cache.py)
+analysis_cache = AnalysisCache()
+# Listagens do histórico por utilizador, por alguns segundos (ver get_uploads)
+upload_lists = UploadListCache()
+
+def get_storage():
+    """Armazenamento do processo, criado no primeiro pedido que precisa dele (None se não estiver disponível)."""
+    global storage, storage_initialised
+    if storage is not None or storage_initialised:
+        return storage
+    with storage_lock:
+        if not storage_initialised:
+            started = time.perf_counter()
+            try:
+                storage = create_storage(get_firestore_client() if STORAGE_BACKEND == 'firestore' else None)
+            except Exception as e:
+                print(f"ERRO: Falha ao inicializar o armazenamento: {e}")
+            startup_timings['storage'] = round(time.perf_counter() - started, 4)
+            storage_initialised = True
+    return storage
+
+def create_app():
+    """Ponto de entrada do servidor (p.ex. gunicorn 'app:create_app()').
+
+    Com EAGER_INIT=1 o Firebase e o armazenamento são inicializados já aqui, no arranque do worker,
+    em vez de no primeiro pedido; por omissão ficam para quando forem precisos.
+    """
+    if os.environ.get('EAGER_INIT', '0') == '1':
+        get_storage()
+    print("Arranque: " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in startup_timings.items()))
+    return app
+
+# Métricas por rota e por etapa em /metrics (ver metrics.py), com as estatísticas das caches
+metrics.init_app(app, {'token_cache': token_cache.stats, 'parse_cache': parse_cache.stats,
+                       'analysis_cache': analysis_cache.stats, 'upload_list_cache': upload_lists.stats,
+                       'startup_seconds': lambda: dict(startup_timings, **firebase_app.timings)})
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/api/upload', methods=['POST'])
+@require_auth("Token inválido ou expirado")
 def upload_file():
-    try:
-        auth_header = request.headers.get('Authorization')
-        id_token = auth_header.split(' ').pop()
-        auth.verify_id_token(id_token)
-    except Exception:
-        return jsonify({"error": "Token inválido ou expirado"}), 401
     files = request.files.getlist('dataFiles')
     if not files or all(f.filename == '' for f in files):
         return jsonify({"error": "Nenhum ficheiro enviado"}), 400
-    grouped_records = []
+    valid_files = []
     for file in files:
         if file.filename != '':
-            try:
-                actual_filename = file.filename.split('/')[-1]
-                icao_code_match = re.match(r'^([A-Z]{4})', actual_filename)
-                if not icao_code_match:
-                    print(f"AVISO: ICAO não determinado para '{actual_filename}'. A pular.")
-                    continue
-                icao_code = icao_code_match.group(1).upper()
-                content = io.StringIO(file.stream.read().decode("utf-8", errors='ignore')).getvalue()
-                parsed_data = parse_data_file(content, icao_code)
-                if parsed_data["records"]:
-                    grouped_records.append({"fileName": actual_filename, "records": parsed_data["records"], "icao_code": parsed_data["icao_code"], "data_date": parsed_data["data_date"]})
-            except Exception as e:
-                print(f"Erro ao processar {file.filename}: {e}")
+            actual_filename = file.filename.split('/')[-1]
+            icao_code_match = re.match(r'^([A-Z]{4})', actual_filename)
+            if not icao_code_match:
+                print(f"AVISO: ICAO não determinado para '{actual_filename}'. A pular.")
+                continue
+            valid_files.append((file, actual_filename, icao_code_match.group(1).upper()))
+
+    # NOVO: ficheiros já processados (mesmo conteúdo, ICAO e versão do parser) vêm da cache de parsing
+    results = [None] * len(valid_files)
+    to_parse = []
+    with timed('upload_cache_lookup'):
+        for position, (file, actual_filename, icao_code) in enumerate(valid_files):
+            cache_key = ParseCache.key(hash_stream(file.stream), icao_code)
+            cached = parse_cache.get(cache_key)
+            if cached is not None:
+                results[position] = (actual_filename, cached)
+            else:
+                to_parse.append((position, file, actual_filename, icao_code, cache_key))
+
+    # Uploads pequenos (ou grandes demais para ler para memória) são processados em sequência;
+    # entre os dois limites os ficheiros são repartidos pelo pool
+    with timed('upload_parse'):
+        if PARSE_WORKERS > 1 and PARALLEL_PARSE_MIN_BYTES <= (request.content_length or 0) <= PARALLEL_PARSE_MAX_BYTES:
+            parsed = parse_files_parallel([(name, icao, file.stream.read()) for _, file, name, icao, _ in to_parse], PARSE_WORKERS)
+            for _, result in parsed:
+                if not isinstance(result, Exception):
+                    metrics.count_parser_lines(result.pop('line_stats', None))
+        else:
+            parsed = []
+            for _, file, actual_filename, icao_code, _ in to_parse:
+                try:
+                    # Decodifica e processa o ficheiro em blocos, sem manter cópias completas em memória
+                    line_stats = {}
+                    parsed.append((actual_filename, parse_data_file(iter_decoded_lines(file.stream), icao_code, compact=True, line_stats=line_stats)))
+                    metrics.count_parser_lines(line_stats)
+                except Exception as e:
+                    parsed.append((actual_filename, e))
+    for (position, _, _, _, cache_key), result in zip(to_parse, parsed):
+        results[position] = result
+        if not isinstance(result[1], Exception):
+            parse_cache.put(cache_key, result[1])
+
+    with timed('upload_serialize'):
+        # NOVO: no formato compacto (ver wire_format.py) cada ficheiro segue em colunas, sem passar por dicionários
+        compact = wants_compact(request)
+        grouped_records = []
+        for actual_filename, parsed_data in results:
+            if isinstance(parsed_data, Exception):
+                print(f"Erro ao processar {actual_filename}: {parsed_data}")
                 continue
-    if not grouped_records:
-        return jsonify({"error": "Nenhum registo válido encontrado nos ficheiros"}), 400
-    return jsonify({"grouped_records": grouped_records})
+            if parsed_data["records"]:
+                # Os registos só voltam ao formato de dicionário na resposta JSON
+                records = encode_batch(parsed_data["records"]) if compact else parsed_data["records"].to_dicts()
+                grouped_records.append({"fileName": actual_filename, "records": records, "icao_code": parsed_data["icao_code"], "data_date": parsed_data["data_date"]})
+        if not grouped_records:
+            return jsonify({"error": "Nenhum registo válido encontrado nos ficheiros"}), 400
+        if compact:
+            return compact_response({"grouped_records": grouped_records}, request)
+        return jsonify({"grouped_records": grouped_records})
+
+# NOVO: Estatísticas da cache de parsing (acertos, falhas, ocupação)
+@app.route('/api/parse_cache/stats', methods=['GET'])
+@require_auth("Autenticação falhou")
+def parse_cache_stats():
+    return jsonify(parse_cache.stats()), 200
+
+# NOVO: Estatísticas da cache de análises (acertos em memória e em disco, falhas, despejos, ocupação)
+@app.route('/api/analysis_cache/stats', methods=['GET'])
+@require_auth("Autenticação falhou")
+def analysis_cache_stats():
+    return jsonify(analysis_cache.stats()), 200
+
+def record_date_range(batch):
+    """(primeiro, último) timestamp do lote; basta olhar para os timestamps distintos."""
+    timestamps = [ts for ts in batch.distinct('timestamp') if ts]
+    return (min(timestamps), max(timestamps)) if timestamps else (None, None)
 
 @app.route('/api/save_records', methods=['POST'])
+@require_auth("Token inválido ou expirado")
 def save_records():
-    try:
-        auth_header = request.headers.get('Authorization')
-        id_token = auth_header.split(' ').pop()
-        decoded_token = auth.verify_id_token(id_token)
-        user_id = decoded_token['uid']
-    except Exception:
-        return jsonify({"error": "Token inválido ou expirado"}), 401
+    user_id = g.user_id
 
-    if not db:
+    storage = get_storage()
+    if not storage:
         return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
     
     try:
@@ -149,135 +208,579 @@ def save_records():
         if not analysis_name or not uploads_to_save:
             return jsonify({"error": "Nome da análise e dados são obrigatórios"}), 400
 
-        all_records_for_this_analysis = [record for group in uploads_to_save for record in group.get('records', [])]
+        all_records_for_this_analysis = RecordBatch()
+        for group in uploads_to_save:
+            all_records_for_this_analysis.extend(group.get('records', []))
         
         if not all_records_for_this_analysis:
             return jsonify({"error": "Nenhum registo para salvar"}), 400
 
         # CORREÇÃO: Lógica robusta para obter as datas de início e fim da análise
-        timestamps = sorted([rec['timestamp'] for rec in all_records_for_this_analysis if rec.get('timestamp')])
-        start_date = timestamps[0] if timestamps else None
-        end_date = timestamps[-1] if timestamps else None
+        start_date, end_date = record_date_range(all_records_for_this_analysis)
 
-        upload_ref = db.collection('flight_uploads').document()
-        upload_ref.set({
+        # NOVO: os rollups por aeródromo são gravados com os registos, para o painel não ter de os reler
+        rollups = list(compute_rollups(all_records_for_this_analysis).values())
+        upload_data = {
             'userId': user_id,
-            'createdAt': firestore.SERVER_TIMESTAMP,
             'analysisName': analysis_name,
             'recordCount': len(all_records_for_this_analysis),
+            'version': 1,
             'startDate': start_date,
             'endDate': end_date
-        })
-        
-        batch = db.batch()
-        for i, rec in enumerate(all_records_for_this_analysis):
-            doc_ref = upload_ref.collection('records').document()
-            batch.set(doc_ref, rec)
-            if (i + 1) % 500 == 0:
-                batch.commit()
-                batch = db.batch()
-        batch.commit()
+        }
+        with timed('storage_write'):
+            upload_id = storage.create_upload(upload_data, all_records_for_this_analysis, rollups)
+        # Quem acabou de salvar costuma abrir a análise a seguir: fica já na cache
+        analysis_cache.put(upload_id, content_version(upload_data), all_records_for_this_analysis)
+        upload_lists.invalidate(user_id)
+        metrics.inc(metrics.RECORDS_WRITTEN, len(all_records_for_this_analysis))
         
         return jsonify({"success": True, "message": f"Análise '{analysis_name}' salva com sucesso!"}), 201
     except Exception as e:
-        print(f"ERRO ao salvar no Firestore: {e}")
+        print(f"ERRO ao salvar a análise: {e}")
         return jsonify({"error": f"Erro interno ao salvar os dados: {str(e)}"}), 500
 
+# NOVO: Acrescenta registos (p.ex. um novo dia) a uma análise já salva, sem regravar os existentes
+@app.route('/api/append_records/<upload_id>', methods=['POST'])
+@require_auth("Token inválido ou expirado")
+def append_records(upload_id):
+    """Recebe {"uploadData": [...]} no formato de /api/upload (só os ficheiros novos).
+
+    Grava apenas os novos registos e atualiza recordCount, startDate/endDate e os rollups
+    somando os do lote novo aos gravados. Com outro acréscimo à mesma análise em curso (ou já
+    gravado depois de a análise ter sido lida) responde 409 sem gravar nada.
+    """
+    user_id = g.user_id
+
+    storage = get_storage()
+    if not storage:
+        return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
+
+    try:
+        payload = request.get_json()
+        uploads_to_append = payload.get('uploadData')
+        if not uploads_to_append:
+            return jsonify({"error": "Dados são obrigatórios"}), 400
+
+        upload_data = storage.get_upload(upload_id)
+        if not upload_data or upload_data['userId'] != user_id or is_pending_deletion(upload_data):
+            return jsonify({"error": "Acesso não autorizado ou upload não encontrado"}), 403
+
+        new_records = RecordBatch()
+        for group in uploads_to_append:
+            new_records.extend(group.get('records', []))
+        if not new_records:
+            return jsonify({"error": "Nenhum registo para acrescentar"}), 400
+
+        start_date, end_date = record_date_range(new_records)
+        dates = [d for d in (upload_data.get('startDate'), upload_data.get('endDate'), start_date, end_date) if d]
+        record_count = (upload_data.get('recordCount') or 0) + len(new_records)
+        fields = {
+            'recordCount': record_count,
+            'version': (upload_data.get('version') or 1) + 1,
+            'startDate': min(dates) if dates else None,
+            'endDate': max(dates) if dates else None
+        }
+        # Análises sem rollups gravados continuam a ser agregadas a partir dos registos
+        rollups = None
+        if upload_data.get('hasRollups'):
+            rollups = list(merge_rollups(storage.read_rollups(upload_id) + list(compute_rollups(new_records).values())).values())
+        try:
+            with timed('storage_write'):
+                storage.append_records(upload_id, upload_data, new_records, rollups, fields)
+        except AppendConflict:
+            return jsonify({"error": "A análise foi alterada por outro pedido entretanto. Recarregue-a e tente de novo."}), 409
+        metrics.inc(metrics.RECORDS_WRITTEN, len(new_records))
+        analysis_cache.invalidate(upload_id)
+        upload_lists.invalidate(user_id)
+
+        return jsonify({"success": True, "message": f"{len(new_records)} registos acrescentados à análise.", "recordCount": record_count}), 200
+    except Exception as e:
+        print(f"ERRO ao acrescentar registos ao upload {upload_id}: {e}")
+        return jsonify({"error": f"Erro interno ao acrescentar os dados: {str(e)}"}), 500
+
 @app.route('/api/get_uploads', methods=['GET'])
+@require_auth("Autenticação falhou")
 def get_uploads():
-    try:
-        auth_header = request.headers.get('Authorization')
-        id_token = auth_header.split(' ').pop()
-        decoded_token = auth.verify_id_token(id_token)
-        user_id = decoded_token['uid']
-    except Exception:
-        return jsonify({"error": "Autenticação falhou"}), 401
+    """Histórico de análises do utilizador, da mais recente para a mais antiga.
+
+    Sem parâmetros devolve a lista completa, como antes. Com page_size devolve uma página
+    {"uploads": [...], "nextCursor": ...}; o nextCursor volta no parâmetro cursor para pedir a seguinte.
+    Só são lidos os campos de UPLOAD_LIST_FIELDS, e a listagem fica em upload_lists por alguns segundos.
+    """
+    user_id = g.user_id
     
-    if not db:
+    storage = get_storage()
+    if not storage:
         return jsonify([]), 200
 
+    page_size = request.args.get('page_size', type=int)
+    cursor_token = request.args.get('cursor')
+    try:
+        cursor = decode_cursor(cursor_token, lambda position: isinstance(position, list) and len(position) == 2
+                               and all(isinstance(v, str) for v in position))
+    except ValueError:
+        return jsonify({"error": "Cursor inválido"}), 400
+    paged = page_size is not None or cursor is not None
+    if paged:
+        page_size = max(1, min(page_size or GET_UPLOADS_MAX_PAGE_SIZE, GET_UPLOADS_MAX_PAGE_SIZE))
+
     try:
-        uploads_ref = db.collection('flight_uploads')
-        query = uploads_ref.where('userId', '==', user_id).order_by('createdAt', direction=firestore.Query.DESCENDING)
-        results = []
-        for doc in query.stream():
-            doc_data = doc.to_dict()
-            results.append({
-                'uploadId': doc.id,
-                'recordCount': doc_data.get('recordCount'),
-                'analysisName': doc_data.get('analysisName', 'Análise Sem Nome'),
-                'startDate': doc_data.get('startDate'),
-                'endDate': doc_data.get('endDate')
-            })
-        return jsonify(results), 200
+        cache_key = (page_size, cursor_token) if paged else None
+        result = upload_lists.get(user_id, cache_key)
+        if result is None:
+            # As análises a ser apagadas são saltadas, por isso pedem-se mais páginas ao armazenamento até a
+            # página ficar cheia (ou, sem page_size, até ao fim da listagem)
+            uploads, next_cursor = [], cursor
+            while True:
+                wanted = page_size - len(uploads) if paged else GET_UPLOADS_MAX_PAGE_SIZE
+                page, next_cursor = storage.list_uploads_page(user_id, UPLOAD_LIST_FIELDS, wanted, next_cursor)
+                uploads += upload_summaries(page)
+                if not next_cursor or (paged and len(uploads) >= page_size):
+                    break
+            result = {"uploads": uploads, "nextCursor": encode_cursor(next_cursor) if next_cursor else None} if paged else uploads
+            upload_lists.put(user_id, cache_key, result)
+        # NOVO: ETag pelo conteúdo da listagem; um histórico igual ao que o navegador já tem volta como 304
+        return cacheable(jsonify(result))
     except Exception as e:
         print(f"ERRO ao buscar uploads: {e}")
         return jsonify({"error": "Não foi possível buscar o histórico de uploads."}), 500
 
+def upload_summaries(uploads):
+    """Itens do histórico a partir de [(upload_id, campos)]; análises a ser apagadas já não aparecem
+    e as de remoção falhada ou parada vêm marcadas."""
+    return [{
+        'uploadId': upload_id,
+        'recordCount': doc_data.get('recordCount'),
+        'analysisName': doc_data.get('analysisName') or 'Análise Sem Nome',
+        'startDate': doc_data.get('startDate'),
+        'endDate': doc_data.get('endDate'),
+        # Remoções falhadas (ou paradas, p.ex. o worker morreu a meio) continuam no histórico, para o utilizador
+        # poder pedir de novo o DELETE
+        'deleteFailed': doc_data.get('status') == 'delete_failed' or is_delete_stalled(doc_data)
+    } for upload_id, doc_data in uploads if doc_data.get('status') != 'deleting' or is_delete_stalled(doc_data)]
+
 @app.route('/api/get_records/<upload_id>', methods=['GET'])
+@require_auth("Autenticação falhou")
 def get_records(upload_id):
+    """Registos de uma análise.
+
+    Sem parâmetros devolve a lista completa, como antes. Com page_size devolve uma página
+    {"records": [...], "nextCursor": ...}; o nextCursor volta no parâmetro cursor para pedir a seguinte.
+    Com format=ndjson os registos são enviados um por linha, à medida que são lidos do armazenamento
+    (a partir do cursor, se indicado). Com o formato compacto (Accept ou encoding=compact, ver
+    wire_format.py) a lista completa ou os registos da página seguem em colunas.
+    """
+    user_id = g.user_id
+
+    storage = get_storage()
+    if not storage:
+        return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
+
     try:
-        auth_header = request.headers.get('Authorization')
-        id_token = auth_header.split(' ').pop()
-        decoded_token = auth.verify_id_token(id_token)
-        user_id = decoded_token['uid']
-    except Exception:
-        return jsonify({"error": "Autenticação falhou"}), 401
-    try:
-        upload_doc = db.collection('flight_uploads').document(upload_id).get()
-        if not upload_doc.exists or upload_doc.to_dict()['userId'] != user_id:
+        upload_data = storage.get_upload(upload_id)
+        if not upload_data or upload_data['userId'] != user_id or is_pending_deletion(upload_data):
             return jsonify({"error": "Acesso não autorizado ou upload não encontrado"}), 403
-        records_ref = db.collection('flight_uploads').document(upload_id).collection('records')
-        records = [doc.to_dict() for doc in records_ref.stream()]
-        return jsonify(records), 200
+        # NOVO: a análise só muda com append_records (que muda a versão): se o navegador já tem esta
+        # versão, responde-se 304 sem ler nem serializar os registos
+        etag = records_etag(upload_id, upload_data)
+        if request.if_none_match.contains(etag):
+            return cacheable(Response(status=304), etag)
+        output_format = request.args.get('format', 'json')
+        page_size = request.args.get('page_size', type=int)
+        try:
+            cursor = decode_cursor(request.args.get('cursor'), lambda position: storage.valid_cursor(upload_data, position))
+        except ValueError:
+            return jsonify({"error": "Cursor inválido"}), 400
+
+        if output_format == 'ndjson':
+            def generate():
+                try:
+                    for rec, _ in storage.iter_records(upload_id, upload_data, cursor):
+                        yield json.dumps(rec, ensure_ascii=False) + '\n'
+                except Exception as e:
+                    # Os cabeçalhos já foram enviados; resta registar o erro e terminar a resposta
+                    print(f"ERRO ao enviar registos do upload {upload_id}: {e}")
+            return cacheable(Response(stream_with_context(generate()), mimetype='application/x-ndjson'), etag)
+
+        if page_size is None and cursor is None:
+            with timed('storage_read'):
+                records = load_records(upload_id, upload_data)
+            with timed('get_records_serialize'):
+                if wants_compact(request):
+                    return cacheable(compact_response(encode_batch(records), request), etag)
+                return cacheable(jsonify(records.to_dicts()), etag)
+
+        page_size = max(1, min(page_size or GET_RECORDS_PAGE_SIZE, GET_RECORDS_MAX_PAGE_SIZE))
+        records, position, next_cursor = [], cursor, None
+        for rec, next_position in storage.iter_records(upload_id, upload_data, cursor):
+            # Lê-se um registo a mais só para saber se há mais páginas
+            if len(records) == page_size:
+                next_cursor = encode_cursor(position)
+                break
+            records.append(rec)
+            position = next_position
+        if wants_compact(request):
+            return cacheable(compact_response({"records": encode_batch(records), "nextCursor": next_cursor}, request), etag)
+        return cacheable(jsonify({"records": records, "nextCursor": next_cursor}), etag)
     except Exception as e:
         print(f"ERRO ao buscar registos do upload {upload_id}: {e}")
         return jsonify({"error": "Não foi possível buscar os registos."}), 500
 
+def content_version(upload_data):
+    """Versão do conteúdo de uma análise: 'version' sobe a cada append_records; o recordCount cobre as
+    análises gravadas antes de haver versão."""
+    return f"{upload_data.get('version') or 1}.{upload_data.get('recordCount') or 0}"
+
+def records_etag(upload_id, upload_data):
+    """ETag forte dos registos: análise, versão do conteúdo e uma marca da representação pedida
+    (parâmetros, formato compacto e compressão), porque cada combinação dá bytes diferentes."""
+    compact = wants_compact(request)
+    variant = '|'.join((request.query_string.decode('latin-1'), 'compact' if compact else 'json',
+                        (preferred_encoding(request.headers.get('Accept-Encoding')) or 'identity') if compact else ''))
+    return f"{upload_id}-{content_version(upload_data)}-{hashlib.sha1(variant.encode('utf-8')).hexdigest()[:12]}"
+
+def cacheable(response, etag=None):
+    """Acrescenta ETag e Cache-Control à resposta. Sem etag, usa o hash do corpo e responde 304 se o
+    If-None-Match do pedido coincidir. 'no-cache' obriga o navegador a revalidar sempre (a análise pode
+    ter sido apagada ou acrescentada noutra sessão)."""
+    response = make_response(response)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if etag is not None:
+        response.set_etag(etag)
+        response.vary.update(('Accept', 'Accept-Encoding'))
+        return response
+    response.add_etag()
+    return response.make_conditional(request)
+
+def encode_cursor(position):
+    """Cursor opaco (JSON em base64) com a posição onde a próxima página começa."""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def decode_cursor(token, is_valid):
+    """Posição guardada num cursor de encode_cursor, ou None sem cursor. Levanta ValueError se o cursor
+    não for descodificável ou is_valid(posição) for falso."""
+    if not token:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    except Exception:
+        raise ValueError(token)
+    if not is_valid(position):
+        raise ValueError(token)
+    return position
+
+def search_args():
+    """Filtros da tabela no pedido: um parâmetro por coluna, start_date/end_date e match=prefix."""
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    return {
+        'filters': {field: request.args[field].strip() for field in SEARCH_FIELDS if request.args.get(field, '').strip()},
+        'start_ts': start_date_str + 'T00:00:00Z' if start_date_str else None,
+        'end_ts': end_date_str + 'T23:59:59Z' if end_date_str else None,
+        'prefix': request.args.get('match') == 'prefix',
+    }
+
+def covers_upload(upload_data, start_ts, end_ts):
+    """O intervalo [start_ts, end_ts] inclui todo o período da análise."""
+    return bool(upload_data.get('startDate')) and start_ts <= upload_data['startDate'] and upload_data.get('endDate', '') <= end_ts
+
+def load_records(upload_id, upload_data, start_ts=None, end_ts=None):
+    """Registos da análise (todos, ou só os do intervalo), servidos da analysis_cache quando possível.
+
+    Numa falha lê-se a análise inteira e guarda-se na cache, para servir qualquer intervalo a seguir;
+    um intervalo com só parte da análise lê apenas esses registos do armazenamento e não passa pela cache.
+    O lote devolvido pode ser partilhado com outros pedidos e não deve ser alterado.
+    """
+    version = content_version(upload_data)
+    batch = analysis_cache.get(upload_id, version)
+    if batch is None:
+        if start_ts and not covers_upload(upload_data, start_ts, end_ts):
+            return storage.read_records(upload_id, upload_data, start_ts, end_ts)
+        batch = storage.read_records(upload_id, upload_data)
+        analysis_cache.put(upload_id, version, batch)
+    if start_ts:
+        return RecordBatch(rec for rec in batch if in_range(rec, start_ts, end_ts))
+    return batch
+
+def get_search_index(upload_id, upload_data):
+    """RecordIndex da análise, construído na primeira pesquisa e guardado com os registos na analysis_cache."""
+    version = content_version(upload_data)
+    index = analysis_cache.get_index(upload_id, version)
+    if index is None:
+        index = RecordIndex(load_records(upload_id, upload_data))
+        analysis_cache.put_index(upload_id, version, index)
+    return index
+
+# NOVO: Pesquisa e filtros da tabela no servidor, sobre índices por coluna da análise
+@app.route('/api/search_records/<upload_id>', methods=['GET'])
+@require_auth("Autenticação falhou")
+def search_records(upload_id):
+    """Registos da análise que cumprem os filtros, do mais recente para o mais antigo.
+
+    Um parâmetro por coluna da tabela (aerodromo, timestamp, matricula, ...) com o texto a procurar;
+    match=prefix procura só no início do valor. start_date/end_date limitam o período e
+    offset/page_size escolhem a página. Devolve {"total", "offset", "records", "nextOffset"}.
+    """
+    user_id = g.user_id
+
+    storage = get_storage()
+    if not storage:
+        return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
+
+    try:
+        upload_data = storage.get_upload(upload_id)
+        if not upload_data or upload_data['userId'] != user_id or is_pending_deletion(upload_data):
+            return jsonify({"error": "Acesso não autorizado ou upload não encontrado"}), 403
+        index = get_search_index(upload_id, upload_data)
+
+        rows = index.search(**search_args())
+        offset = max(0, request.args.get('offset', 0, type=int))
+        page_size = max(1, min(request.args.get('page_size', SEARCH_PAGE_SIZE, type=int), GET_RECORDS_MAX_PAGE_SIZE))
+        page = rows[offset:offset + page_size]
+        next_offset = offset + page_size if offset + page_size < len(rows) else None
+        return jsonify({"total": len(rows), "offset": offset, "records": index.batch.take(page), "nextOffset": next_offset}), 200
+    except Exception as e:
+        print(f"ERRO ao pesquisar registos do upload {upload_id}: {e}")
+        return jsonify({"error": "Não foi possível pesquisar os registos."}), 500
+
+# NOVO: Exportação de uma análise (CSV ou Parquet), gerada em fluxo a partir do armazenamento
+@app.route('/api/export/<upload_id>', methods=['GET'])
+@require_auth("Autenticação falhou")
+def export_records(upload_id):
+    """Aceita os mesmos filtros de /api/search_records; os registos seguem pela ordem em que foram guardados."""
+    user_id = g.user_id
+
+    storage = get_storage()
+    if not storage:
+        return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
+
+    output_format = request.args.get('format', 'csv')
+    if output_format not in ('csv', 'parquet'):
+        return jsonify({"error": "Formato de exportação inválido"}), 400
+    if output_format == 'parquet' and not parquet_available():
+        return jsonify({"error": "Exportação em Parquet indisponível no servidor"}), 501
+
+    try:
+        upload_data = storage.get_upload(upload_id)
+        if not upload_data or upload_data['userId'] != user_id or is_pending_deletion(upload_data):
+            return jsonify({"error": "Acesso não autorizado ou upload não encontrado"}), 403
+    except Exception as e:
+        print(f"ERRO ao exportar o upload {upload_id}: {e}")
+        return jsonify({"error": "Não foi possível exportar os registos."}), 500
+    matches = make_record_filter(**search_args())
+
+    def records():
+        for rec, _ in storage.iter_records(upload_id, upload_data):
+            if matches is None or matches(rec):
+                yield rec
+
+    def generate():
+        try:
+            yield from (iter_csv(records()) if output_format == 'csv' else iter_parquet(records()))
+        except Exception as e:
+            # Os cabeçalhos já foram enviados; resta registar o erro e terminar a resposta
+            print(f"ERRO ao exportar o upload {upload_id}: {e}")
+
+    filename = f"dados_voo_{upload_id}.{output_format}"
+    mimetype = 'text/csv' if output_format == 'csv' else 'application/vnd.apache.parquet'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+def find_uploads_in_range(user_id, start_ts, end_ts):
+    """[(upload_id, dados)] das análises do utilizador cujo período se sobrepõe a [start_ts, end_ts], por data de início."""
+    uploads = []
+    for upload_id, doc_data in storage.list_uploads(user_id):
+        if is_pending_deletion(doc_data) or not doc_data.get('startDate') or doc_data['startDate'] > end_ts or doc_data.get('endDate', '') < start_ts:
+            continue
+        uploads.append((upload_id, doc_data))
+    uploads.sort(key=lambda upload: upload[1]['startDate'])
+    return uploads
+
+def fan_out(func, items, max_workers=RANGE_QUERY_MAX_WORKERS):
+    """Aplica func a cada item em paralelo (no máximo max_workers leituras ao armazenamento em simultâneo).
+
+    A latência fica perto da leitura mais lenta em vez da soma de todas; os resultados
+    mantêm a ordem dos itens e o primeiro erro é propagado.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+# NOVO: Registos de todas as análises num intervalo de datas (trazido de app250924.py)
+@app.route('/api/get_aggregated_data', methods=['GET'])
+@require_auth("Autenticação falhou")
+def get_aggregated_data():
+    user_id = g.user_id
+
+    storage = get_storage()
+    if not storage:
+        return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
+
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    if not start_date_str or not end_date_str:
+        return jsonify({"error": "As datas de início e fim são obrigatórias"}), 400
+    try:
+        start_ts = start_date_str + 'T00:00:00Z'
+        end_ts = end_date_str + 'T23:59:59Z'
+        batches = fan_out(lambda upload: load_records(upload[0], upload[1], start_ts, end_ts),
+                          find_uploads_in_range(user_id, start_ts, end_ts))
+        all_records = RecordBatch()
+        for batch in batches:
+            all_records.extend(batch)
+        return jsonify(all_records.to_dicts()), 200
+    except Exception as e:
+        print(f"ERRO ao agregar dados: {e}")
+        return jsonify({"error": "Não foi possível processar a solicitação."}), 500
+
+# NOVO: Painel calculado no servidor, para uma análise (upload_id) ou um intervalo de datas (start_date/end_date)
+@app.route('/api/dashboard', methods=['GET'])
+@require_auth("Autenticação falhou")
+def get_dashboard():
+    user_id = g.user_id
+
+    storage = get_storage()
+    if not storage:
+        return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
+
+    upload_id = request.args.get('upload_id')
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    aerodromo = request.args.get('aerodromo')
+    if not upload_id and not (start_date_str and end_date_str):
+        return jsonify({"error": "Indique uma análise ou as datas de início e fim"}), 400
+
+    try:
+        if upload_id:
+            upload_data = storage.get_upload(upload_id)
+            if not upload_data or upload_data['userId'] != user_id or is_pending_deletion(upload_data):
+                return jsonify({"error": "Acesso não autorizado ou upload não encontrado"}), 403
+            if upload_data.get('hasRollups'):
+                rollups = storage.read_rollups(upload_id)
+            else:
+                rollups = list(compute_rollups(load_records(upload_id, upload_data)).values())
+        else:
+            start_ts = start_date_str + 'T00:00:00Z'
+            end_ts = end_date_str + 'T23:59:59Z'
+
+            def upload_rollups(upload):
+                upload_id, upload_data = upload
+                # Análises totalmente dentro do intervalo usam os rollups gravados; as restantes são filtradas registo a registo
+                if upload_data.get('hasRollups') and covers_upload(upload_data, start_ts, end_ts):
+                    return storage.read_rollups(upload_id)
+                return list(compute_rollups(load_records(upload_id, upload_data, start_ts, end_ts)).values())
+            rollups = [r for part in fan_out(upload_rollups, find_uploads_in_range(user_id, start_ts, end_ts)) for r in part]
+        return jsonify(build_dashboard_from_rollups(merge_rollups(rollups), aerodromo)), 200
+    except Exception as e:
+        print(f"ERRO ao calcular o painel: {e}")
+        return jsonify({"error": "Não foi possível calcular o painel."}), 500
+
+def is_delete_stalled(upload_data):
+    """Remoção marcada como 'deleting' mas sem progresso há DELETE_STALL_SECONDS (o worker que a corria morreu)."""
+    return upload_data.get('status') == 'deleting' and time.time() - (upload_data.get('deleteHeartbeat') or 0) >= DELETE_STALL_SECONDS
+
+def is_pending_deletion(upload_data):
+    """Análise a ser apagada ou com a remoção falhada (dados incompletos): as rotas de leitura respondem 403."""
+    return upload_data.get('status') in ('deleting', 'delete_failed')
+
 # NOVO: Rota para apagar uma análise salva
+# A análise é marcada como 'deleting' (deixa de aparecer nas listagens) e a remoção corre em segundo plano;
+# o progresso é consultado em /api/delete_status/<upload_id>. Um DELETE repetido numa remoção em curso só
+# devolve o estado; numa remoção falhada ou interrompida (sem progresso há DELETE_STALL_SECONDS) retoma-a
 @app.route('/api/delete_upload/<upload_id>', methods=['DELETE'])
+@require_auth("Autenticação falhou")
 def delete_upload(upload_id):
-    try:
-        auth_header = request.headers.get('Authorization')
-        id_token = auth_header.split(' ').pop()
-        decoded_token = auth.verify_id_token(id_token)
-        user_id = decoded_token['uid']
-    except Exception:
-        return jsonify({"error": "Autenticação falhou"}), 401
+    user_id = g.user_id
     
-    if not db:
+    storage = get_storage()
+    if not storage:
         return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
 
     try:
-        upload_ref = db.collection('flight_uploads').document(upload_id)
-        upload_doc = upload_ref.get()
+        upload_data = storage.get_upload(upload_id)
 
-        if not upload_doc.exists:
+        if not upload_data:
             return jsonify({"error": "Upload não encontrado"}), 404
-        if upload_doc.to_dict().get('userId') != user_id:
+        if upload_data.get('userId') != user_id:
             return jsonify({"error": "Acesso não autorizado"}), 403
 
-        # Apaga a subcoleção 'records' em lotes
-        records_ref = upload_ref.collection('records')
-        while True:
-            docs = records_ref.limit(100).stream()
-            deleted_count = 0
-            batch = db.batch()
-            for doc in docs:
-                batch.delete(doc.reference)
-                deleted_count += 1
-            if deleted_count == 0:
-                break
-            batch.commit()
+        status_url = f"/api/delete_status/{upload_id}"
+        if upload_data.get('status') == 'deleting' and not is_delete_stalled(upload_data):
+            # Já está a ser apagada (neste ou noutro worker): não se começa uma segunda remoção
+            return jsonify({"success": True, "message": "A análise já está a ser apagada.", "statusUrl": status_url,
+                            "deleted": upload_data.get('deletedCount', 0), "total": upload_data.get('deleteTotal', 0)}), 202
 
-        # Apaga o documento principal da análise
-        upload_ref.delete()
-        
-        return jsonify({"success": True, "message": "Análise apagada com sucesso!"}), 200
+        storage.update_upload(upload_id, {'status': 'deleting', 'deletedCount': 0, 'deleteTotal': storage.purge_size(upload_data),
+                                          'deleteHeartbeat': time.time()})
+        analysis_cache.invalidate(upload_id)
+        upload_lists.invalidate(user_id)
+        schedule_purge(upload_id, user_id)
+
+        return jsonify({"success": True, "message": "A análise está a ser apagada.", "statusUrl": status_url}), 202
     except Exception as e:
         print(f"ERRO ao apagar o upload {upload_id}: {e}")
         return jsonify({"error": "Não foi possível apagar o registo."}), 500
 
+def schedule_purge(upload_id, user_id):
+    """Entrega a remoção ao deletion_executor, se ainda não estiver a correr neste processo.
+
+    Uma remoção interrompida (p.ex. reinício do servidor) fica 'deleting' sem progresso e é retomada ao pedir
+    de novo o DELETE depois de DELETE_STALL_SECONDS.
+    """
+    with deletions_lock:
+        if upload_id in deletions_in_progress:
+            return
+        deletions_in_progress.add(upload_id)
+    deletion_executor.submit(purge_upload, upload_id, user_id)
+
+def purge_upload(upload_id, user_id):
+    """Apaga os registos, os rollups e por fim os metadados da análise, gravando o progresso pelo caminho."""
+    try:
+        # deleteHeartbeat mostra aos outros workers que a remoção continua viva
+        deleted_count = storage.purge_upload(upload_id, on_progress=lambda n: storage.update_upload(upload_id, {'deletedCount': n, 'deleteHeartbeat': time.time()}))
+        print(f"Análise {upload_id} apagada ({deleted_count} documentos).")
+    except Exception as e:
+        print(f"ERRO ao apagar o upload {upload_id}: {e}")
+        try:
+            storage.update_upload(upload_id, {'status': 'delete_failed'})
+            # A análise volta a aparecer no histórico, marcada, para se poder pedir de novo o DELETE
+            upload_lists.invalidate(user_id)
+        except Exception as update_error:
+            print(f"ERRO ao marcar a falha da remoção do upload {upload_id}: {update_error}")
+    finally:
+        with deletions_lock:
+            deletions_in_progress.discard(upload_id)
+
+@app.route('/api/delete_status/<upload_id>', methods=['GET'])
+@require_auth("Autenticação falhou")
+def delete_status(upload_id):
+    user_id = g.user_id
+
+    storage = get_storage()
+    if not storage:
+        return jsonify({"error": "Conexão com o banco de dados não disponível"}), 500
+
+    try:
+        upload_data = storage.get_upload(upload_id)
+        # Os metadados são os últimos a ser apagados
+        if not upload_data:
+            return jsonify({"status": "deleted"}), 200
+        if upload_data.get('userId') != user_id:
+            return jsonify({"error": "Acesso não autorizado"}), 403
+        return jsonify({
+            "status": upload_data.get('status', 'active'),
+            "deleted": upload_data.get('deletedCount', 0),
+            "total": upload_data.get('deleteTotal', 0)
+        }), 200
+    except Exception as e:
+        print(f"ERRO ao consultar a remoção do upload {upload_id}: {e}")
+        return jsonify({"error": "Não foi possível consultar o estado da remoção."}), 500
+
+startup_timings['app_setup'] = round(time.perf_counter() - _startup_began - startup_timings['imports'], 4)
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
 
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import hashlib
+import os
+import time
+
+from flask import g, jsonify, request
+
+from firebase_app import ensure_app
+from lru import LRUCache
+from metrics import timed
+
+# Verificação de revogação (uma chamada extra ao Firebase por token) e, quando ativa,
+# por quanto tempo um token verificado pode ser reutilizado sem nova verificação
+AUTH_CHECK_REVOKED = os.environ.get('AUTH_CHECK_REVOKED', '0') == '1'
+AUTH_REVOCATION_TTL = int(os.environ.get('AUTH_REVOCATION_TTL', 60))
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 1024))
+
+
+class TokenCache:
+    """Cache LRU de tokens já verificados, chaveada pelo hash do token e válida até ao 'exp'."""
+
+    def __init__(self, maxsize=AUTH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = LRUCache(max_entries=maxsize)  # hash -> (token descodificado, expira em)
+
+    @staticmethod
+    def key(id_token):
+        return hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+
+    def get(self, key, now=None):
+        now = now or time.time()
+        entry = self._entries.get(key, valid=lambda entry: entry[1] > now)
+        return entry[0] if entry is not None else None
+
+    def put(self, key, decoded_token, expires_at):
+        self._entries.put(key, (decoded_token, expires_at))
+
+    def stats(self):
+        return self._entries.stats()
+
+
+token_cache = TokenCache()
+
+
+def verify_token(id_token):
+    """auth.verify_id_token com cache; levanta a mesma exceção do Firebase se o token for inválido."""
+    key = TokenCache.key(id_token)
+    decoded_token = token_cache.get(key)
+    if decoded_token is not None:
+        return decoded_token
+    # O firebase_admin.auth só é importado (e a app Firebase inicializada) na primeira verificação
+    ensure_app()
+    from firebase_admin import auth
+    decoded_token = auth.verify_id_token(id_token, check_revoked=AUTH_CHECK_REVOKED)
+    expires_at = decoded_token['exp']
+    if AUTH_CHECK_REVOKED:
+        expires_at = min(expires_at, time.time() + AUTH_REVOCATION_TTL)
+    token_cache.put(key, decoded_token, expires_at)
+    return decoded_token
+
+
+def require_auth(error_message="Autenticação falhou"):
+    """Decorador das rotas da API: valida o 'Authorization: Bearer <token>' e põe o uid em g.user_id."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                auth_header = request.headers.get('Authorization')
+                id_token = auth_header.split(' ').pop()
+                with timed('auth'):
+                    decoded_token = verify_token(id_token)
+                g.user_id = decoded_token['uid']
+            except Exception:
+                return jsonify({"error": error_message}), 401
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""Benchmark do BulkWriter contra o Firestore falso: vazão em função do número de commits em
+paralelo, com latência simulada por round trip e falhas transitórias periódicas.
+
+Uso: python -m benchmarks.bench_bulk_writer [--docs N] [--latency S] [--fail-every N]
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.fake_firestore import FakeFirestore
+from bulk_writer import BulkWriter
+
+
+def run(docs, in_flight, latency, fail_every):
+    client = FakeFirestore(latency=latency, fail_every=fail_every)
+    collection = client.collection('flight_uploads').document('bench').collection('chunks')
+    start = time.perf_counter()
+    with BulkWriter(client, max_in_flight=in_flight, base_delay=0.01) as writer:
+        for i in range(docs):
+            writer.set(collection.document(f"{i:06d}"), {'index': i})
+    elapsed = time.perf_counter() - start
+    stored = len(collection.get())
+    if stored != docs:
+        raise AssertionError(f"{stored} documentos gravados, esperados {docs}")
+    return elapsed, writer.stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--fail-every', type=int, default=7)
+    args = parser.parse_args(argv)
+    for in_flight in (1, 2, 4, 8, 16):
+        elapsed, stats = run(args.docs, in_flight, args.latency, args.fail_every)
+        print(f"{in_flight:2d} em paralelo: {args.docs / elapsed:10,.0f} docs/s  ({stats['commits']} commits, {stats['retries']} repetições)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
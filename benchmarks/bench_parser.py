@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Benchmark do parser: confere que o motor compilado produz exatamente a mesma saída
+que o parser anterior e mede linhas/segundo de ambos. Com --workers compara também
+o processamento sequencial de uma pasta com o modo paralelo (parse_files_parallel).
+
+Uso: python -m benchmarks.bench_parser [--lines N] [--workers N --files N] [ficheiros reais ...]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+
+from benchmarks import legacy_parser
+from benchmarks.synthetic import fuzz_lines, generate_lines
+import flight_parser
+
+
+def _run(parse, content, icao):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parse(content, icao)
+
+
+def check_equivalence(contents):
+    for content in contents:
+        expected = _run(legacy_parser.parse_data_file, content, 'SBXX')
+        got = _run(flight_parser.parse_data_file, content, 'SBXX')
+        if expected != got:
+            for line in content.split('\n'):
+                a = _run(legacy_parser.parse_data_file, line, 'SBXX')
+                b = _run(flight_parser.parse_data_file, line, 'SBXX')
+                if a != b:
+                    raise AssertionError(f"Saída divergente para a linha {line!r}:\n{a}\n{b}")
+            raise AssertionError("Saída divergente")
+
+
+def lines_per_second(parse, content, icao, repeat=3):
+    n = content.count('\n') + 1
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _run(parse, content, icao)
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def bench_parallel(n_files, lines_per_file, workers):
+    files = [(f"SB{i:02d}", 'SBXX', '\n'.join(generate_lines(lines_per_file, seed=i, noise=False)).encode('utf-8')) for i in range(n_files)]
+    start = time.perf_counter()
+    sequential = [(name, _run(flight_parser.parse_bytes, data, icao)) for name, icao, data in files]
+    seq_time = time.perf_counter() - start
+    flight_parser.parse_files_parallel(files[:workers], workers)  # aquece o pool
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parallel = flight_parser.parse_files_parallel(files, workers)
+    par_time = time.perf_counter() - start
+    if parallel != sequential:
+        raise AssertionError("O modo paralelo alterou o resultado")
+    print(f"pasta com {n_files} ficheiros: sequencial {seq_time:.2f}s, {workers} processos {par_time:.2f}s ({seq_time / par_time:.1f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument('--files', type=int, default=30, dest='n_files')
+    parser.add_argument('files', nargs='*')
+    args = parser.parse_args(argv)
+
+    content = '\n'.join(generate_lines(args.lines))
+    contents = [content, '\n'.join(fuzz_lines(50000))]
+    for path in args.files:
+        with open(path, encoding='utf-8', errors='ignore') as f:
+            contents.append(f.read())
+    check_equivalence(contents)
+    print("Saída idêntica ao parser anterior.")
+
+    legacy = lines_per_second(legacy_parser.parse_data_file, content, 'SBXX')
+    compiled = lines_per_second(flight_parser.parse_data_file, content, 'SBXX')
+    print(f"parser anterior: {legacy:,.0f} linhas/s")
+    print(f"motor compilado: {compiled:,.0f} linhas/s ({compiled / legacy:.1f}x)")
+    if args.workers > 1:
+        bench_parallel(args.n_files, args.lines // args.n_files, args.workers)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Benchmark de memória: lista de dicionários (formato atual da API) contra RecordBatch,
+para um mês realista de movimentos (30 aeródromos x 31 dias por omissão).
+
+Uso: python -m benchmarks.bench_records_memory [--airports N] [--days N] [--lines-per-day N]
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import sys
+import tracemalloc
+
+from benchmarks.synthetic import generate_lines
+from flight_parser import parse_data_file
+from flight_records import RecordBatch
+
+
+def month_of_records(airports, days, lines_per_day):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for a in range(airports):
+            icao = f"SB{chr(65 + a // 26)}{chr(65 + a % 26)}"
+            for d in range(days):
+                yield from parse_data_file('\n'.join(generate_lines(lines_per_day, seed=a * 100 + d, noise=False)), icao)['records']
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--airports', type=int, default=30)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--lines-per-day', type=int, default=250)
+    args = parser.parse_args(argv)
+
+    records, dict_bytes = measure(lambda: list(month_of_records(args.airports, args.days, args.lines_per_day)))
+    batch, batch_bytes = measure(lambda: RecordBatch(month_of_records(args.airports, args.days, args.lines_per_day)))
+    if batch.to_dicts() != records:
+        raise AssertionError("RecordBatch não reproduz os registos originais")
+    n = len(records)
+    print(f"{n:,} registos")
+    print(f"lista de dicionários: {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / n:.0f} B/registo)")
+    print(f"RecordBatch:          {batch_bytes / 2**20:8.1f} MiB ({batch_bytes / n:.0f} B/registo, {dict_bytes / batch_bytes:.1f}x menor)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
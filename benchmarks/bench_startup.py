@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Benchmark do arranque a frio: cada execução é um processo Python novo que importa app.py,
+chama create_app() e responde ao primeiro pedido (GET /) e ao primeiro pedido da API
+(GET /api/get_uploads, que inicializa a autenticação e o armazenamento).
+
+O armazenamento é um SQLite em memória e a verificação de tokens é local, por isso não precisa de
+credenciais. Com --repo mede outra cópia do projeto (p.ex. um checkout da versão anterior) para
+comparar; com --top lista os módulos mais lentos a importar (python -X importtime).
+
+Uso: python -m benchmarks.bench_startup [--runs N] [--repo PASTA] [--top N] [--json resultados.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Corre no processo filho; imprime uma linha JSON com os tempos (s) desde o início do script
+_CHILD = r'''
+import contextlib, io, json, sys, time
+began = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+timings = {}
+with contextlib.redirect_stdout(io.StringIO()):
+    import app as app_module
+    timings['import'] = time.perf_counter() - began
+    flask_app = app_module.create_app() if hasattr(app_module, 'create_app') else app_module.app
+    timings['create_app'] = time.perf_counter() - began
+    client = flask_app.test_client()
+    status = client.get('/').status_code
+    timings['first_response'] = time.perf_counter() - began
+    from firebase_admin import auth
+    auth.verify_id_token = lambda id_token, check_revoked=False: {'uid': id_token, 'exp': time.time() + 3600}
+    api_status = client.get('/api/get_uploads', headers={'Authorization': 'Bearer bench'}).status_code
+    timings['first_api_response'] = time.perf_counter() - began
+print(json.dumps({'timings': timings, 'status': status, 'apiStatus': api_status}))
+'''
+
+
+def run_once(repo):
+    env = dict(os.environ, STORAGE_BACKEND='sqlite', SQLITE_PATH=':memory:')
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', _CHILD, repo], cwd=repo, env=env, capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - started
+    result = json.loads(output.strip().splitlines()[-1])
+    result['timings']['process_wall'] = wall
+    return result
+
+
+def slowest_imports(repo, top):
+    """Os 'top' módulos com maior tempo cumulativo de importação ao importar app.py."""
+    env = dict(os.environ, STORAGE_BACKEND='sqlite', SQLITE_PATH=':memory:')
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import sys; sys.path.insert(0, {repo!r}); import app"],
+                            cwd=repo, env=env, capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--repo', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument('--top', type=int, default=0)
+    parser.add_argument('--json', dest='json_path')
+    args = parser.parse_args(argv)
+
+    repo = os.path.abspath(args.repo)
+    run_once(repo)  # aquece a cache de bytecode e a do sistema de ficheiros
+    runs = [run_once(repo) for _ in range(args.runs)]
+    phases = list(runs[0]['timings'])
+    summary = {phase: {'median': round(statistics.median(r['timings'][phase] for r in runs), 4),
+                       'min': round(min(r['timings'][phase] for r in runs), 4)} for phase in phases}
+    print(f"{repo} ({args.runs} execuções, estado dos pedidos: {runs[0]['status']}/{runs[0]['apiStatus']})")
+    for phase, values in summary.items():
+        print(f"  {phase:<20} mediana {values['median'] * 1000:8.1f} ms   mínimo {values['min'] * 1000:8.1f} ms")
+    report = {'repo': repo, 'python': sys.version.split()[0], 'runs': args.runs, 'phases': summary}
+    if args.top:
+        report['slowestImports'] = [{'module': name, 'seconds': seconds} for seconds, name in slowest_imports(repo, args.top)]
+        print("  importações mais lentas (cumulativo):")
+        for item in report['slowestImports']:
+            print(f"    {item['seconds'] * 1000:8.1f} ms  {item['module']}")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados gravados em {args.json_path}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
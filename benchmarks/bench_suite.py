@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""Suite de benchmarks offline: parser, /api/upload, /api/save_records e /api/get_records sobre
+pastas sintéticas (benchmarks.synthetic) de vários tamanhos, com o armazenamento num Firestore
+falso (benchmarks.fake_firestore) ou num SQLite em memória. Não precisa de credenciais.
+
+Para cada tamanho e etapa mede o tempo (melhor de --repeat), a vazão e o pico de memória alocada
+(tracemalloc, numa execução à parte para não afetar os tempos). Com --json grava os resultados
+num ficheiro, para comparar execuções e detetar regressões. As etapas get_records leem do
+armazenamento (a analysis_cache é esvaziada antes de cada pedido), exceto get_records_cached.
+
+Uso: python -m benchmarks.bench_suite [--sizes 5000,50000] [--backend firestore|sqlite|all]
+                                      [--latency S] [--repeat N] [--json resultados.json]
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.fake_firestore import FakeFirestore
+from benchmarks.synthetic import generate_files
+from flight_parser import iter_decoded_lines, parse_data_file
+import storage as storage_module
+
+AIRPORTS = 3
+MOVEMENTS_PER_DAY = 400
+USER_TOKEN = 'bench-user'
+
+
+def folder_for(size):
+    """Pasta sintética com cerca de 'size' movimentos: AIRPORTS aeródromos, MOVEMENTS_PER_DAY por dia."""
+    days = max(1, round(size / (AIRPORTS * MOVEMENTS_PER_DAY)))
+    per_day = max(1, size // (AIRPORTS * days))
+    return generate_files(airports=AIRPORTS, days=days, movements_per_day=per_day)
+
+
+def measure(run, repeat):
+    """(melhor tempo, pico de memória em bytes, resultado da última execução)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def make_storage(backend, latency):
+    if backend == 'sqlite':
+        return storage_module.SQLiteStorage(':memory:'), None
+    client = FakeFirestore(latency=latency)
+    return storage_module.FirestoreStorage(client), client
+
+
+def load_app():
+    """Importa app.py com a verificação de tokens do Firebase substituída por uma local."""
+    from firebase_admin import auth
+    auth.verify_id_token = lambda id_token, check_revoked=False: {'uid': id_token, 'exp': time.time() + 3600}
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    return app
+
+
+def bench_size(app_module, size, backend, latency, repeat):
+    files = folder_for(size)
+    total_bytes = sum(len(data) for _, data in files)
+    total_lines = sum(data.count(b'\n') for _, data in files)
+    stages = {}
+
+    def add(stage, seconds, peak, records, **extra):
+        stages[stage] = dict({
+            'seconds': round(seconds, 6), 'peakBytes': peak, 'records': records,
+            'recordsPerSecond': round(records / seconds) if seconds else None,
+        }, **extra)
+
+    def parse_all():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [parse_data_file(iter_decoded_lines(io.BytesIO(data)), name[:4], compact=True) for name, data in files]
+    seconds, peak, parsed = measure(parse_all, repeat)
+    records = sum(len(p['records']) for p in parsed)
+    add('parser', seconds, peak, records, linesPerSecond=round(total_lines / seconds), megabytesPerSecond=round(total_bytes / seconds / 2**20, 2))
+
+    client = app_module.app.test_client()
+    headers = {'Authorization': f"Bearer {USER_TOKEN}"}
+
+    def upload():
+        # A cache de parsing é esvaziada para medir o processamento completo
+        app_module.parse_cache.clear()
+        data = {'dataFiles': [(io.BytesIO(content), name) for name, content in files]}
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.post('/api/upload', data=data, headers=headers, content_type='multipart/form-data')
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/upload devolveu {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response
+    seconds, peak, response = measure(upload, repeat)
+    grouped_records = response.get_json()['grouped_records']
+    add('upload', seconds, peak, records, requestBytes=total_bytes, responseBytes=len(response.get_data()))
+
+    payload = json.dumps({'analysisName': f"bench {size}", 'uploadData': grouped_records}).encode('utf-8')
+    app_module.storage, firestore_client = make_storage(backend, latency)
+
+    def save():
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = client.post('/api/save_records', data=payload, headers=headers, content_type='application/json')
+        if response.status_code != 201:
+            raise RuntimeError(f"/api/save_records devolveu {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    seconds, peak, _ = measure(save, repeat)
+    add('save_records', seconds, peak, records, requestBytes=len(payload))
+
+    upload_id = client.get('/api/get_uploads', headers=headers).get_json()[0]['uploadId']
+    if firestore_client is not None:
+        reads_before = firestore_client.stats['reads']
+
+    def get_records():
+        # save_records deixa a análise na analysis_cache; esvazia-se para medir a leitura do armazenamento
+        app_module.analysis_cache.clear()
+        response = client.get(f"/api/get_records/{upload_id}", headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/get_records devolveu {response.status_code}")
+        return response
+    seconds, peak, response = measure(get_records, repeat)
+    if len(response.get_json()) != records:
+        raise AssertionError(f"get_records devolveu {len(response.get_json())} registos, esperados {records}")
+    extra = {'responseBytes': len(response.get_data())}
+    if firestore_client is not None:
+        extra['firestoreReadsPerRequest'] = (firestore_client.stats['reads'] - reads_before) // (repeat + 1)
+    add('get_records', seconds, peak, records, **extra)
+
+    def get_records_cached():
+        return client.get(f"/api/get_records/{upload_id}", headers=headers)
+    get_records_cached()  # deixa a análise na cache
+    seconds, peak, response = measure(get_records_cached, repeat)
+    add('get_records_cached', seconds, peak, records, responseBytes=len(response.get_data()))
+
+    def get_records_ndjson():
+        response = client.get(f"/api/get_records/{upload_id}?format=ndjson", headers=headers)
+        return sum(len(chunk) for chunk in response.response)
+    seconds, peak, body_bytes = measure(get_records_ndjson, repeat)
+    add('get_records_ndjson', seconds, peak, records, responseBytes=body_bytes)
+
+    def get_records_compact():
+        app_module.analysis_cache.clear()
+        response = client.get(f"/api/get_records/{upload_id}?encoding=compact", headers=dict(headers, **{'Accept-Encoding': 'gzip'}))
+        return len(response.get_data())
+    seconds, peak, body_bytes = measure(get_records_compact, repeat)
+    add('get_records_compact', seconds, peak, records, responseBytes=body_bytes)
+
+    return {'size': size, 'backend': backend, 'files': len(files), 'lines': total_lines, 'bytes': total_bytes, 'records': records, 'stages': stages}
+
+
+def print_result(result):
+    print(f"\n{result['backend']}: {result['records']:,} registos, "
+          f"{result['files']} ficheiros, {result['bytes'] / 2**20:.1f} MiB")
+    for stage, values in result['stages'].items():
+        print(f"  {stage:<20} {values['seconds']:8.3f}s {values['recordsPerSecond'] or 0:>12,} registos/s "
+              f"{values['peakBytes'] / 2**20:8.1f} MiB (pico)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='5000,50000', help="número aproximado de movimentos por execução, separados por vírgulas")
+    parser.add_argument('--backend', choices=['firestore', 'sqlite', 'all'], default='all')
+    parser.add_argument('--latency', type=float, default=0.0, help="latência simulada por round trip do Firestore falso (s)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', dest='json_path', help="ficheiro onde gravar os resultados (use - para a saída padrão)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    backends = ['firestore', 'sqlite'] if args.backend == 'all' else [args.backend]
+    app_module = load_app()
+    results = []
+    for size in sizes:
+        for backend in backends:
+            result = bench_size(app_module, size, backend, args.latency, args.repeat)
+            results.append(result)
+            if args.json_path != '-':
+                print_result(result)
+
+    report = {
+        'createdAt': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'repeat': args.repeat, 'latency': args.latency, 'results': results,
+    }
+    if args.json_path == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados gravados em {args.json_path}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
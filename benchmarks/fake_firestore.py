@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""Cliente Firestore em memória, com o subconjunto da API usado por app.py.
+
+Serve para correr benchmarks e ensaios locais sem credenciais do Firebase. Conta as
+leituras, escritas e commits e pode simular latência por round trip e erros transitórios.
+"""
+
+import itertools
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from google.cloud import firestore as _firestore
+
+_OPS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a is not None and a < b,
+    '<=': lambda a, b: a is not None and a <= b,
+    '>': lambda a, b: a is not None and a > b,
+    '>=': lambda a, b: a is not None and a >= b,
+    'in': lambda a, b: a in b,
+}
+
+
+class FakeFirestore:
+    def __init__(self, latency=0.0, fail_every=0):
+        self._docs = {}  # caminho completo -> dict
+        self._update_times = {}  # caminho completo -> marca da última escrita (data, número de ordem)
+        self._write_counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.latency = latency
+        self.fail_every = fail_every
+        self.stats = {'reads': 0, 'writes': 0, 'deletes': 0, 'commits': 0}
+        self._commit_counter = itertools.count(1)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def collection_group(self, name):
+        return FakeQuery(self, None, group=name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def write_option(self, **kwargs):
+        return kwargs
+
+    def _round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _count(self, kind, n=1):
+        with self._lock:
+            self.stats[kind] += n
+
+    def _store(self, path, data, merge=False, option=None):
+        now = datetime.now(timezone.utc)
+        data = {k: (now if v is _firestore.SERVER_TIMESTAMP else v) for k, v in data.items()}
+        with self._lock:
+            # option=client.write_option(last_update_time=...): só escreve se o documento não mudou desde então
+            if option and self._update_times.get(path) != option.get('last_update_time'):
+                from google.api_core.exceptions import FailedPrecondition
+                raise FailedPrecondition(f"Documento alterado: {path}")
+            if merge and path in self._docs:
+                self._docs[path].update(data)
+            else:
+                self._docs[path] = dict(data)
+            for k in [k for k, v in data.items() if v is _firestore.DELETE_FIELD]:
+                del self._docs[path][k]
+            self._update_times[path] = (now, next(self._write_counter))
+
+    def _delete(self, path):
+        with self._lock:
+            self._docs.pop(path, None)
+            self._update_times.pop(path, None)
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field)
+
+
+class FakeDocument:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None):
+        self._client._round_trip()
+        self._client._count('reads')
+        with self._client._lock:
+            data = self._client._docs.get(self.path)
+            data = dict(data) if data is not None else None
+            update_time = self._client._update_times.get(self.path)
+        if data is not None and field_paths:
+            data = {k: v for k, v in data.items() if k in field_paths}
+        return FakeDocumentSnapshot(self, data, update_time)
+
+    def set(self, data, merge=False):
+        self._client._round_trip()
+        self._client._count('writes')
+        self._client._store(self.path, data, merge)
+
+    def update(self, data, option=None):
+        self._client._round_trip()
+        self._client._count('writes')
+        if self.path not in self._client._docs:
+            raise KeyError(f"Documento inexistente: {self.path}")
+        self._client._store(self.path, data, merge=True, option=option)
+
+    def delete(self):
+        self._client._round_trip()
+        self._client._count('deletes')
+        self._client._delete(self.path)
+
+
+class FakeQuery:
+    def __init__(self, client, path, group=None, filters=(), order=(), limit=None, offset=0, start_after=None, fields=None):
+        self._client = client
+        self._path = path
+        self._group = group
+        self._filters = list(filters)
+        self._order = list(order)
+        self._limit = limit
+        self._offset = offset
+        self._start_after = start_after
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = dict(client=self._client, path=self._path, group=self._group, filters=self._filters, order=self._order,
+                     limit=self._limit, offset=self._offset, start_after=self._start_after, fields=self._fields)
+        state.update(changes)
+        return FakeQuery(**state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + [(field_path, op_string, value)])
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(order=self._order + [(field_path, direction)])
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, count):
+        return self._copy(offset=count)
+
+    def start_after(self, document_or_values):
+        return self._copy(start_after=document_or_values)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def _matches(self, path):
+        parent, _ = path.rsplit('/', 1)
+        if self._group is not None:
+            return parent.rsplit('/', 1)[-1] == self._group
+        return parent == self._path
+
+    def _sort_key(self, item):
+        path, data = item
+        doc_id = path.rsplit('/', 1)[-1]
+        return tuple(doc_id if field == '__name__' else data.get(field) for field, _ in self._order) + (doc_id,)
+
+    def stream(self):
+        self._client._round_trip()
+        with self._client._lock:
+            items = [(p, dict(d)) for p, d in self._client._docs.items() if self._matches(p)]
+        items = [(p, d) for p, d in items if all(_OPS[op](d.get(f), v) for f, op, v in self._filters)]
+        if self._order:
+            descending = any(direction in ('DESCENDING', _firestore.Query.DESCENDING) for _, direction in self._order)
+            items.sort(key=self._sort_key, reverse=descending)
+        else:
+            items.sort(key=lambda item: item[0].rsplit('/', 1)[-1])
+        if self._start_after is not None:
+            cursor = self._start_after
+            if isinstance(cursor, FakeDocumentSnapshot):
+                ids = [p for p, _ in items]
+                position = ids.index(cursor.reference.path) + 1 if cursor.reference.path in ids else 0
+            else:
+                values = tuple(cursor.values()) if isinstance(cursor, dict) else tuple(cursor)
+                keys = [self._sort_key(item)[:len(values)] for item in items]
+                position = next((i for i, k in enumerate(keys) if k == values), -1) + 1
+            items = items[position:]
+        items = items[self._offset:]
+        if self._limit is not None:
+            items = items[:self._limit]
+        self._client._count('reads', max(len(items), 1))
+        for path, data in items:
+            if self._fields is not None:
+                data = {k: v for k, v in data.items() if k in self._fields}
+            yield FakeDocumentSnapshot(FakeDocument(self._client, path), data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+
+    def document(self, document_id=None):
+        return FakeDocument(self._client, f"{self._path}/{document_id or uuid.uuid4().hex[:20]}")
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def __len__(self):
+        return len(self._ops)
+
+    def set(self, reference, data, merge=False):
+        self._ops.append(('set', reference, data, merge))
+
+    def update(self, reference, data):
+        self._ops.append(('update', reference, data, True))
+
+    def delete(self, reference):
+        self._ops.append(('delete', reference, None, False))
+
+    def commit(self):
+        if len(self._ops) > 500:
+            raise ValueError("Um lote do Firestore aceita no máximo 500 operações")
+        self._client._round_trip()
+        n = next(self._client._commit_counter)
+        if self._client.fail_every and n % self._client.fail_every == 0:
+            from google.api_core.exceptions import Aborted
+            raise Aborted("Contenção simulada")
+        self._client._count('commits')
+        for kind, reference, data, merge in self._ops:
+            if kind == 'delete':
+                self._client._count('deletes')
+                self._client._delete(reference.path)
+            else:
+                self._client._count('writes')
+                self._client._store(reference.path, data, merge)
+        self._ops = []
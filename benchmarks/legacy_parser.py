@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import re
+from datetime import datetime
+
+# Cópia fiel do parse_data_file anterior ao motor compilado (flight_parser).
+# Serve apenas de referência para os benchmarks e para a verificação de saída idêntica.
+
+def parse_data_file(file_content, icao_code):
+    lines = file_content.split('\n')
+    records = []
+    data_date_from_file = None
+    for line in lines:
+        line = line.strip()
+        if not line or len(line) < 25 or re.search(r'\s+(MG|V)\s+\d{4}\s*$', line):
+            continue
+        record = {'timestamp': None, 'matricula': 'N/A', 'tipo_aeronave': 'N/A', 'origem': 'N/A', 'destino': 'N/A', 'regra_voo': 'N/A', 'pista': '', 'responsavel': 'N/A', 'flight_class': 'N/A', 'aerodromo': icao_code}
+        try:
+            date_str_header = line[9:15]
+            data_block = line[15:].strip()
+            route_block = ''
+            match = None
+            patterns = [
+                r'^(?P<matricula>(?:AZU|GLO|TAM)\d{4})(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)', r'^(?P<matricula>FAB\d+)(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)',
+                r'^(?P<matricula>N[A-Z0-9]+)(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)', r'^(?P<matricula>\S+)\s+(?P<tipo>[A-Z0-9]+)\s+(?P<classe>[GSNM])\s+(?P<resto>.*)',
+                r'^(?P<matricula>\S+)\s+(?P<tipo_classe>[A-Z0-9]+[GSNM])\s+(?P<resto>.*)',
+            ]
+            for pattern in patterns:
+                match = re.match(pattern, data_block)
+                if match: break
+            if not match: continue
+            g = match.groupdict()
+            record['matricula'] = g['matricula']
+            route_block = g['resto'].strip()
+            if 'tipo_classe' in g:
+                type_class_str = g['tipo_classe']
+                record['tipo_aeronave'] = type_class_str[:-1]; record['flight_class'] = type_class_str[-1]
+            else:
+                record['tipo_aeronave'] = g['tipo']; record['flight_class'] = g['classe']
+            op_match = re.search(r'\s([A-Z]{4})$', route_block)
+            if op_match: record['responsavel'] = op_match.group(1); route_block = route_block[:op_match.start()].strip()
+            pista_match = re.search(r'\s(07|25)$', route_block)
+            if pista_match: record['pista'] = pista_match.group(1); route_block = route_block[:pista_match.start()].strip()
+            rule_match = re.search(r'(IV|VV)', route_block)
+            if rule_match: record['regra_voo'] = 'IFR' if rule_match.group(1) == 'IV' else 'VFR'
+            horario_str = ''; waypoints = []
+            overflight_match = re.search(r'([A-Z0-9]{4}).*?(\d{4}).*?([A-Z0-9]{4})', route_block)
+            if overflight_match:
+                waypoints.extend([overflight_match.group(1), overflight_match.group(3)]); horario_str = overflight_match.group(2)
+            else:
+                single_move_match = re.search(r'([A-Z0-9]{4}).*?(\d{4})', route_block)
+                if single_move_match: waypoints.append(single_move_match.group(1)); horario_str = single_move_match.group(2)
+                else:
+                    time_only_match = re.search(r'(\d{4})', route_block)
+                    if time_only_match: horario_str = time_only_match.group(1)
+            if len(waypoints) >= 2: record['destino'], record['origem'] = waypoints[0], waypoints[1]
+            elif len(waypoints) == 1: record['origem'], record['destino'] = icao_code, waypoints[0]
+            else: record['origem'], record['destino'] = icao_code, icao_code
+            if horario_str:
+                dt_obj = datetime.strptime(f"{date_str_header}{horario_str}", '%d%m%y%H%M')
+                record['timestamp'] = dt_obj.isoformat() + 'Z'
+                if data_date_from_file is None: data_date_from_file = record['timestamp']
+            records.append(record)
+        except Exception as e:
+            print(f"ERRO ao processar linha: '{line.strip()}'. Erro: {e}")
+    return {"records": records, "icao_code": icao_code, "data_date": data_date_from_file}
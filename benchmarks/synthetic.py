@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Gerador de ficheiros de movimentos sintéticos, no layout de largura fixa que parse_data_file espera.
+
+generate_lines produz linhas soltas (com lixo opcional) para medir e comparar o parser;
+generate_day / generate_files produzem ficheiros diários completos, como os que são enviados
+pelo painel: um aeródromo por ficheiro, horários ao longo do dia e linhas de resumo MG/V no fim.
+"""
+
+import random
+from datetime import date, timedelta
+
+_TOKENS = ['AZU4567', 'GLO1234', 'TAM3321', 'FAB2101', 'N123AB', 'PPXYZ', 'E195S', 'A320N', 'C172G', 'B738', 'S', 'G',
+           'SBGR', 'SBKP', 'SBRJ', 'SBSP', 'IV', 'VV', 'IVV', '07', '25', '0730', '2359', '2460', '1261', 'MG', 'V',
+           'AZUL', 'GOLB', 'abcd', 'X1', '0000', '1', '\t', '  ', 'Ã']
+
+# Companhias (prefixo do voo, operador) e frota típica de cada uma
+AIRLINES = (('AZU', 'AZUL', ('E195', 'E295', 'A320', 'AT76')), ('GLO', 'GOLB', ('B737', 'B738', 'B38M')), ('TAM', 'TAMB', ('A319', 'A320', 'A321')))
+MILITARY_TYPES = ('C95', 'C97', 'C105', 'C130', 'KC39', 'H60')
+GENERAL_AVIATION_TYPES = ('C172', 'C182', 'PA34', 'BE20', 'BE58', 'C525', 'PC12', 'R44')
+AIRPORTS = ('SBGR', 'SBKP', 'SBRJ', 'SBSP', 'SBBR', 'SBCF', 'SBPA', 'SBSV', 'SBRF', 'SBCT', 'SBFL', 'SBGL', 'SBMT', 'SBJD')
+# Proporção de cada tipo de linha num ficheiro diário (o resto são voos de aviação geral)
+AIRLINE_SHARE = 0.5
+MILITARY_SHARE = 0.08
+FOREIGN_SHARE = 0.07
+
+
+def generate_lines(n, seed=42, noise=True):
+    """Linhas realistas no layout de largura fixa, mais linhas de resumo e (com noise) lixo."""
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(n):
+        header = f"SBXX{i % 100000:05d}{rnd.randint(1, 28):02d}{rnd.randint(1, 12):02d}25"
+        kind = rnd.random()
+        hhmm = f"{rnd.randint(0, 23):02d}{rnd.randint(0, 59):02d}"
+        if kind < 0.35:
+            body = f"{rnd.choice(['AZU', 'GLO', 'TAM'])}{rnd.randint(1000, 9999)}{rnd.choice(['E195', 'A320', 'B738'])}{rnd.choice('SN')}  {rnd.choice(['SBGR', 'SBKP'])} {rnd.choice(['IV', 'VV'])} {hhmm} {rnd.choice(['SBRJ', 'SBSP'])} {rnd.choice(['07', '25'])} {rnd.choice(['AZUL', 'GOLB', 'TAMB'])}"
+        elif kind < 0.45:
+            body = f"FAB{rnd.randint(1, 9999)}C95G  IV {hhmm} SBBR"
+        elif kind < 0.55:
+            body = f"N{rnd.randint(100, 999)}AB BE20 G  VV {hhmm}"
+        elif kind < 0.85:
+            body = f"PP{rnd.choice('ABCXYZ')}{rnd.choice('ABCXYZ')}{rnd.choice('ABCXYZ')} C172G {rnd.choice(['IV', 'VV', ''])} {rnd.choice(['SBMT', ''])} {hhmm} {rnd.choice(['07', '25', ''])}"
+        elif kind < 0.92 or not noise:
+            body = f"TOTAL MOVIMENTOS {rnd.choice(['MG', 'V'])} {hhmm}"
+        else:
+            body = ' '.join(rnd.choice(_TOKENS) for _ in range(rnd.randint(1, 9)))
+        lines.append(header + body)
+    return lines
+
+
+def fuzz_lines(n, seed=7):
+    """Linhas aleatórias (tokens soltos, espaçamento irregular, horários inválidos) para a verificação de equivalência."""
+    rnd = random.Random(seed)
+    lines = []
+    for _ in range(n):
+        header = ''.join(rnd.choice('0123456789 A') for _ in range(15))
+        sep = rnd.choice([' ', '  ', '\t', ''])
+        lines.append(header + sep.join(rnd.choice(_TOKENS) for _ in range(rnd.randint(1, 10))))
+    return lines
+
+
+def _registration(rnd):
+    return 'P' + rnd.choice('PRST') + ''.join(rnd.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))
+
+
+def _movement(rnd, icao, hhmm):
+    """Corpo de uma linha de movimento (depois do cabeçalho de 15 caracteres) no aeródromo icao."""
+    other = rnd.choice([a for a in AIRPORTS if a != icao])
+    # Partidas: 'destino regra HHMM'; chegadas: 'destino regra HHMM origem'
+    departure = rnd.random() < 0.5
+    route = f"{other} {{rule}} {hhmm}" if departure else f"{icao} {{rule}} {hhmm} {other}"
+    runway = rnd.choice(['07', '25'])
+    kind = rnd.random()
+    if kind < AIRLINE_SHARE:
+        prefix, operator, fleet = rnd.choice(AIRLINES)
+        return f"{prefix}{rnd.randint(1000, 9999)}{rnd.choice(fleet)}{rnd.choice('SN')}  {route.format(rule='IV')} {runway} {operator}"
+    kind -= AIRLINE_SHARE
+    if kind < MILITARY_SHARE:
+        return f"FAB{rnd.randint(2000, 2999)}{rnd.choice(MILITARY_TYPES)}M  {route.format(rule=rnd.choice(['IV', 'IV', 'VV']))} {runway}"
+    kind -= MILITARY_SHARE
+    if kind < FOREIGN_SHARE:
+        return f"N{rnd.randint(100, 999)}{rnd.choice(['AB', 'CD', 'GX'])} {rnd.choice(['C525', 'BE20', 'GLF5'])} G  {route.format(rule='IV')} {runway}"
+    # Aviação geral: regra visual na maior parte e voos locais (só horário), às vezes sem pista
+    rule = rnd.choice(['VV', 'VV', 'VV', 'IV'])
+    if rnd.random() < 0.25:
+        return f"{_registration(rnd)} {rnd.choice(GENERAL_AVIATION_TYPES)}G {rule} {hhmm} {rnd.choice([runway, ''])}".rstrip()
+    return f"{_registration(rnd)} {rnd.choice(GENERAL_AVIATION_TYPES)}G {route.format(rule=rule)} {runway}"
+
+
+def generate_day(icao, day, movements, seed=0):
+    """Conteúdo (bytes) de um ficheiro diário com 'movements' movimentos e as linhas de resumo MG/V."""
+    rnd = random.Random(f"{icao}-{day.isoformat()}-{seed}")
+    date_header = day.strftime('%d%m%y')
+    # Mais movimentos durante o dia do que de madrugada
+    minutes = sorted(min(1439, max(0, int(rnd.triangular(0, 1440, 780)))) for _ in range(movements))
+    lines = []
+    for sequence, minute in enumerate(minutes, 1):
+        hhmm = f"{minute // 60:02d}{minute % 60:02d}"
+        lines.append(f"{icao}{sequence % 100000:05d}{date_header} {_movement(rnd, icao, hhmm)}")
+    end_of_day = f"{minutes[-1] // 60:02d}{minutes[-1] % 60:02d}" if minutes else '2359'
+    lines.append(f"{icao}{0:05d}{date_header} TOTAL MOVIMENTOS MG {movements % 10000:04d}")
+    lines.append(f"{icao}{0:05d}{date_header} TOTAL VISUAIS V {end_of_day}")
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def airport_codes(n):
+    """n códigos ICAO distintos: os reais primeiro e depois sintéticos (SBAA, SBAB, ...)."""
+    codes = list(AIRPORTS[:n])
+    index = 0
+    while len(codes) < n:
+        code = f"SB{chr(65 + index // 26 % 26)}{chr(65 + index % 26)}"
+        if code not in codes:
+            codes.append(code)
+        index += 1
+    return codes
+
+
+def generate_files(airports=3, days=7, movements_per_day=300, start=date(2025, 3, 1), seed=0):
+    """Pasta sintética: [(nome do ficheiro, bytes)], um ficheiro por aeródromo e dia (ICAO no início do nome)."""
+    files = []
+    for icao in airport_codes(airports):
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            files.append((f"{icao}_{day:%Y%m%d}.txt", generate_day(icao, day, movements_per_day, seed)))
+    return files
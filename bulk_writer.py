@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+MAX_BATCH_OPS = 500
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors():
+    """Erros do Firestore que justificam repetir o commit (contenção, quota, indisponibilidade momentânea).
+
+    O google.api_core só é importado no primeiro BulkWriter, e não no arranque do servidor.
+    """
+    from google.api_core import exceptions as gexc
+    return (gexc.Aborted, gexc.DeadlineExceeded, gexc.ResourceExhausted, gexc.ServiceUnavailable,
+            gexc.InternalServerError, gexc.TooManyRequests)
+
+
+class BulkWriter:
+    """Pipeline de escrita em lote com vários commits em paralelo.
+
+    As operações são agrupadas em lotes (até 500 operações / 8 MiB) e cada lote é enviado numa
+    thread, com no máximo max_in_flight commits pendentes. Um commit que falha com erro transitório
+    é repetido com backoff exponencial. Como os documentos devem ter IDs determinísticos, repetir
+    um commit reescreve os mesmos documentos e nunca duplica registos.
+
+    Uso:
+        with BulkWriter(db, max_in_flight=8) as writer:
+            writer.set(ref, data)
+    """
+
+    def __init__(self, client, max_in_flight=8, max_retries=5, base_delay=0.2, max_delay=10.0):
+        self._client = client
+        self._retryable_errors = retryable_errors()
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._futures = []
+        self._ops = []
+        self._bytes = 0
+        self.stats = {'commits': 0, 'retries': 0, 'operations': 0}
+        self._stats_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._executor.shutdown(wait=True)
+
+    def set(self, reference, data, size=0):
+        self._add(('set', reference, data), size)
+
+    def delete(self, reference):
+        self._add(('delete', reference, None), 0)
+
+    def _add(self, op, size):
+        if self._ops and (len(self._ops) >= MAX_BATCH_OPS or self._bytes + size > MAX_BATCH_BYTES):
+            self.flush()
+        self._ops.append(op)
+        self._bytes += size
+
+    def flush(self):
+        """Envia o lote corrente; bloqueia enquanto houver max_in_flight commits pendentes."""
+        if not self._ops:
+            return
+        ops, self._ops, self._bytes = self._ops, [], 0
+        self._slots.acquire()
+        future = self._executor.submit(self._commit, ops)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def close(self):
+        """Envia o que faltar, espera por todos os commits e propaga o primeiro erro."""
+        try:
+            self.flush()
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def _commit(self, ops):
+        attempt = 0
+        while True:
+            # O lote é reconstruído a cada tentativa: um WriteBatch não deve ser reutilizado após falha
+            batch = self._client.batch()
+            for kind, reference, data in ops:
+                if kind == 'set':
+                    batch.set(reference, data)
+                else:
+                    batch.delete(reference)
+            try:
+                batch.commit()
+            except self._retryable_errors:
+                attempt += 1
+                if attempt > self._max_retries:
+                    raise
+                with self._stats_lock:
+                    self.stats['retries'] += 1
+                metrics.inc(metrics.FIRESTORE_RETRIES)
+                delay = min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+                time.sleep(delay * (0.5 + random.random() / 2))
+                continue
+            with self._stats_lock:
+                self.stats['commits'] += 1
+                self.stats['operations'] += len(ops)
+            if metrics.METRICS_ENABLED:
+                deletes = sum(1 for kind, _, _ in ops if kind == 'delete')
+                metrics.inc(metrics.FIRESTORE_COMMITS)
+                metrics.inc(metrics.FIRESTORE_OPERATIONS, len(ops) - deletes, 'write')
+                metrics.inc(metrics.FIRESTORE_OPERATIONS, deletes, 'delete')
+            return
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+from flight_records import FIELDS, RecordBatch
+
+# Calcula no servidor os mesmos conjuntos de dados que o painel (templates/index.html) montava
+# no navegador com Array.reduce.
+#
+# O cálculo passa sempre por "rollups": contagens por aeródromo (por hora, dia, dia da semana x hora,
+# rota, tipo de aeronave, regra de voo e destino). São calculadas com pandas a partir dos registos ou
+# lidas já prontas do Firestore (gravadas em save_records), e somadas entre análises.
+# Os empates são resolvidos pela ordem de primeira aparição, como no sort estável do JavaScript.
+COMMERCIAL_PREFIXES = ('AZU', 'GLO', 'TAM')
+DIAS_SEMANA = ['Dom', 'Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb']
+ROLLUP_COUNTS = ('hora', 'dia', 'semanaHora', 'rotas', 'aeronaves', 'regras', 'destinos')
+
+
+def _key(value):
+    # As chaves dos mapas do Firestore têm de ser strings não vazias
+    return str(value) if value not in (None, '') else 'N/A'
+
+
+def _row_codes(np, batch, field):
+    return np.frombuffer(batch.codes(field), dtype=np.uint32)
+
+
+def _categorical(pd, np, codes, values, mask=None):
+    """Coluna com values[código] em cada registo; valores repetidos partilham a categoria e None (ou mask falso) fica vazio."""
+    dictionary, categories = pd.factorize(pd.Series(values, dtype=object))
+    rows = dictionary[codes]
+    if mask is not None:
+        rows = np.where(mask, rows, -1)
+    return pd.Categorical.from_codes(rows, categories)
+
+
+def records_to_frame(records):
+    """Colunas usadas nos rollups, uma linha por registo.
+
+    As conversões (chaves, datas, prefixos) correm uma vez por valor distinto de cada coluna do
+    RecordBatch e são depois expandidas pelos códigos dos registos, sem ciclos em Python por registo.
+    """
+    # pandas só é importado no primeiro cálculo, para não atrasar o arranque dos workers
+    import numpy as np
+    import pandas as pd
+    batch = records if isinstance(records, RecordBatch) else RecordBatch(records)
+    if not len(batch):
+        return pd.DataFrame()
+    codes = {field: _row_codes(np, batch, field) for field in FIELDS}
+    values = {field: batch.distinct(field) for field in FIELDS}
+
+    def column(field, convert):
+        return _categorical(pd, np, codes[field], [convert(v) for v in values[field]])
+
+    def same(field, other):
+        # Compara duas colunas pelos códigos: cada valor de field é traduzido para o código que tem em other
+        other_codes = {v: code for code, v in enumerate(values[other])}
+        translated = np.array([other_codes.get(v, -1) for v in values[field]], dtype=np.int64)
+        return translated[codes[field]] == codes[other]
+
+    def truthy(field):
+        return np.array([bool(v) for v in values[field]])[codes[field]]
+
+    # getUTCDay() do JavaScript: domingo = 0; sem data/hora válida as chaves de tempo ficam vazias
+    ts = pd.to_datetime(pd.Series(values['timestamp'], dtype=object), errors='coerce', utc=True)
+    valid = ts.notna().tolist()
+    hours = [int(h) if ok else None for h, ok in zip(ts.dt.hour.fillna(0).tolist(), valid)]
+    weekdays = [int(d + 1) % 7 if ok else None for d, ok in zip(ts.dt.dayofweek.fillna(0).tolist(), valid)]
+
+    # Rotas: um código por par (origem, destino) presente
+    origins, destinations = values['origem'], values['destino']
+    pairs, pair_values = pd.factorize(codes['origem'].astype(np.int64) * len(destinations) + codes['destino'])
+    routes = [f"{origins[p // len(destinations)]}-{destinations[p % len(destinations)]}" for p in pair_values.tolist()]
+
+    return pd.DataFrame({
+        'aerodromo': column('aerodromo', _key),
+        'comercial': np.array([bool(m) and m.startswith(COMMERCIAL_PREFIXES) for m in values['matricula']])[codes['matricula']],
+        'sobrevoo': truthy('aerodromo') & ~same('origem', 'aerodromo') & ~same('destino', 'aerodromo'),
+        'hora': _categorical(pd, np, codes['timestamp'], [str(h) if h is not None else None for h in hours]),
+        'dia': _categorical(pd, np, codes['timestamp'], [t[:10] if ok else None for t, ok in zip(values['timestamp'], valid)]),
+        'semanaHora': _categorical(pd, np, codes['timestamp'], [f"{d}-{h}" if h is not None else None for d, h in zip(weekdays, hours)]),
+        'rotas': _categorical(pd, np, pairs, routes, mask=truthy('origem') & truthy('destino') & ~same('origem', 'destino')),
+        'aeronaves': column('tipo_aeronave', _key),
+        'regras': column('regra_voo', _key),
+        'destinos': column('destino', _key),
+    })
+
+
+def _new_rollup(aerodromo):
+    rollup = {'aerodromo': aerodromo, 'total': 0, 'comerciais': 0, 'sobrevoos': 0}
+    rollup.update({name: {} for name in ROLLUP_COUNTS})
+    return rollup
+
+
+def compute_rollups(records):
+    """{aerodromo: rollup} com as contagens de cada aeródromo, pela ordem de primeira aparição."""
+    df = records_to_frame(records)
+    if not len(df):
+        return {}
+    rollups = {a: _new_rollup(a) for a in df['aerodromo'].unique().tolist()}
+
+    per_airport = df.groupby('aerodromo', sort=False, observed=True)
+    for a, row in per_airport.agg(total=('comercial', 'size'), comerciais=('comercial', 'sum'), sobrevoos=('sobrevoo', 'sum')).iterrows():
+        rollups[a].update(total=int(row['total']), comerciais=int(row['comerciais']), sobrevoos=int(row['sobrevoos']))
+
+    # Registos sem chave (sem data/hora válida, sem rota) ficam fora das contagens dessa dimensão
+    for name in ROLLUP_COUNTS:
+        counts = df.groupby(['aerodromo', name], sort=False, observed=True).size()
+        for (a, k), n in counts.items():
+            rollups[a][name][k] = int(n)
+    return rollups
+
+
+def merge_rollups(rollup_list):
+    """Soma rollups (de várias análises ou documentos) por aeródromo."""
+    merged = {}
+    for rollup in rollup_list:
+        target = merged.setdefault(rollup['aerodromo'], _new_rollup(rollup['aerodromo']))
+        for field in ('total', 'comerciais', 'sobrevoos'):
+            target[field] += rollup.get(field, 0)
+        for name in ROLLUP_COUNTS:
+            counts = target[name]
+            for k, n in rollup.get(name, {}).items():
+                counts[k] = counts.get(k, 0) + n
+    return merged
+
+
+def _sum_counts(rollups, name):
+    total = {}
+    for rollup in rollups:
+        for k, n in rollup[name].items():
+            total[k] = total.get(k, 0) + n
+    return total
+
+
+def _top(counts, n=None, exclude=()):
+    items = sorted(((k, v) for k, v in counts.items() if k not in exclude), key=lambda kv: -kv[1])
+    if n is not None:
+        items = items[:n]
+    return {'labels': [k for k, _ in items], 'data': [v for _, v in items]}
+
+
+def _stats(rollups):
+    hourly = _sum_counts(rollups, 'hora')
+    horario_pico = '-'
+    if hourly:
+        peak = max(hourly.values())
+        horario_pico = ', '.join(f"{h}h" for h in sorted(int(h) for h, v in hourly.items() if v == peak))
+    return {
+        'total': sum(r['total'] for r in rollups),
+        'voosComerciais': sum(r['comerciais'] for r in rollups),
+        'sobrevoos': sum(r['sobrevoos'] for r in rollups),
+        'horarioPico': horario_pico,
+    }
+
+
+def _macro(rollups):
+    perfil = sorted(rollups, key=lambda r: -r['total'])[:15]
+    semana_hora = _sum_counts(rollups, 'semanaHora')
+    daily = sorted(_sum_counts(rollups, 'dia').items())
+    return {
+        'ranking': _top({r['aerodromo']: r['total'] for r in rollups}, 15),
+        'topRotas': _top(_sum_counts(rollups, 'rotas'), 10),
+        'perfil': {
+            'labels': [r['aerodromo'] for r in perfil],
+            'IFR': [r['regras'].get('IFR', 0) for r in perfil],
+            'VFR': [r['regras'].get('VFR', 0) for r in perfil],
+        },
+        'pulso': {'labels': [d for d, _ in daily], 'data': [n for _, n in daily]},
+        'heatmap': {'dias': DIAS_SEMANA, 'data': [[semana_hora.get(f"{day}-{hour}", 0) for hour in range(24)] for day in range(7)]},
+    }
+
+
+def _detailed(rollup, aerodromo):
+    semana = [0] * 7
+    for k, n in rollup['semanaHora'].items():
+        semana[int(k.split('-')[0])] += n
+    return {
+        'regras': _top(rollup['regras']),
+        'destinos': _top(rollup['destinos'], 8, exclude=(aerodromo,)),
+        'porHora': [rollup['hora'].get(str(h), 0) for h in range(24)],
+        'porDiaSemana': {'labels': DIAS_SEMANA, 'data': semana},
+        'aeronaves': _top(rollup['aeronaves'], 5, exclude=('N/A',)),
+    }
+
+
+def build_dashboard_from_rollups(rollups, aerodromo=None):
+    """Visão macro (todos os aeródromos) ou, com aerodromo, a visão detalhada desse aeródromo."""
+    result = {'aerodromos': sorted(a for a in rollups if a != 'N/A')}
+    if aerodromo:
+        rollup = rollups.get(aerodromo, _new_rollup(aerodromo))
+        result['stats'] = _stats([rollup])
+        result['detalhado'] = _detailed(rollup, aerodromo)
+    else:
+        selected = list(rollups.values())
+        result['stats'] = _stats(selected)
+        result['macro'] = _macro(selected) if selected else None
+    return result
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+
+# Inicialização preguiçosa do Firebase Admin SDK: o firebase_admin e o cliente gRPC do Firestore só são
+# importados e criados no primeiro uso (verificação de um token ou acesso ao Firestore), uma vez por processo.
+# Assim cada worker do gunicorn arranca sem este custo e não herda ligações de outro processo.
+_lock = threading.Lock()
+_app_ready = None
+_firestore_client = None
+_firestore_ready = False
+# Tempos (s) das fases de inicialização, para as métricas de arranque
+timings = {}
+
+
+def _credentials():
+    from firebase_admin import credentials
+    creds_json_str = os.environ.get('FIREBASE_CREDENTIALS_JSON')
+    if creds_json_str:
+        return credentials.Certificate(json.loads(creds_json_str))
+    cred_path = 'firebase-credentials.json'
+    if os.path.exists(cred_path):
+        return credentials.Certificate(cred_path)
+    print("AVISO: Credenciais do Firebase não encontradas.")
+    return None
+
+
+def ensure_app():
+    """Inicializa a app Firebase por omissão, se houver credenciais; devolve True se ficar disponível."""
+    global _app_ready
+    if _app_ready is not None:
+        return _app_ready
+    with _lock:
+        if _app_ready is None:
+            started = time.perf_counter()
+            try:
+                import firebase_admin
+                cred = _credentials()
+                # CORREÇÃO: Evita reinicializar a app Firebase, o que pode causar problemas no servidor
+                if cred and not firebase_admin._apps:
+                    firebase_admin.initialize_app(cred)
+                _app_ready = bool(firebase_admin._apps)
+            except Exception as e:
+                print(f"ERRO: Falha ao inicializar o Firebase Admin SDK: {e}")
+                _app_ready = False
+            timings['firebase_app'] = round(time.perf_counter() - started, 4)
+    return _app_ready
+
+
+def get_firestore_client():
+    """Cliente Firestore do processo, criado no primeiro pedido; None sem credenciais."""
+    global _firestore_client, _firestore_ready
+    if _firestore_ready:
+        return _firestore_client
+    if not ensure_app():
+        return None
+    with _lock:
+        if not _firestore_ready:
+            started = time.perf_counter()
+            try:
+                from firebase_admin import firestore
+                _firestore_client = firestore.client()
+                print("Firebase Admin SDK e Firestore inicializados com sucesso.")
+            except Exception as e:
+                print(f"ERRO: Falha ao criar o cliente Firestore: {e}")
+            timings['firestore_client'] = round(time.perf_counter() - started, 4)
+            _firestore_ready = True
+    return _firestore_client
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import functools
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+
+from flight_records import RecordBatch
+
+# Motor de parsing dos ficheiros de movimento.
+# Os padrões são compilados uma única vez e cada linha é percorrida numa só passagem:
+# - cabeçalho de largura fixa (line[9:15]) com a data;
+# - um único regex com as cinco alternativas de matrícula/tipo/classe, testadas na mesma ordem do parser antigo;
+# - campos finais (operador, pista, regra IV/VV) lidos pelo fim da string, sem novas pesquisas;
+# - um único regex para waypoints e horário.
+
+_HEADER_RE = re.compile(
+    r'(?P<m1>(?:AZU|GLO|TAM)\d{4})(?P<tc1>[A-Z0-9]+[GSNM])\s+(?P<r1>.*)'
+    r'|(?P<m2>FAB\d+)(?P<tc2>[A-Z0-9]+[GSNM])\s+(?P<r2>.*)'
+    r'|(?P<m3>N[A-Z0-9]+)(?P<tc3>[A-Z0-9]+[GSNM])\s+(?P<r3>.*)'
+    r'|(?P<m4>\S+)\s+(?P<t4>[A-Z0-9]+)\s+(?P<c4>[GSNM])\s+(?P<r4>.*)'
+    r'|(?P<m5>\S+)\s+(?P<tc5>[A-Z0-9]+[GSNM])\s+(?P<r5>.*)'
+)
+# Sobrevoo (origem, horário, destino), movimento simples (waypoint, horário) ou só horário.
+# A primeira posição onde qualquer um casa é a mesma que as três pesquisas sequenciais encontravam.
+_ROUTE_RE = re.compile(r'([A-Z0-9]{4}).*?(\d{4})(?:.*?([A-Z0-9]{4}))?|(\d{4})')
+_PISTAS = ('07', '25')
+READ_CHUNK_SIZE = 64 * 1024
+# Tamanho alvo dos pedaços em que ficheiros grandes são divididos no modo paralelo
+PARALLEL_SPLIT_BYTES = 4 * 1024 * 1024
+# Versão dos resultados do parser: mudar sempre que a mesma linha passe a dar um registo diferente
+# (faz parte da chave da cache de parsing, por isso invalida as entradas antigas)
+PARSER_VERSION = '2'
+
+_executor = None
+_executor_workers = None
+
+# 'HHMM' -> 'HH:MM:00Z' para todos os horários válidos (00:00 a 23:59)
+_TIME_SUFFIXES = {f"{h:02d}{m:02d}": f"{h:02d}:{m:02d}:00Z" for h in range(24) for m in range(60)}
+_ASCII_DIGITS = frozenset('0123456789')
+
+
+def _is_summary_line(line):
+    # Equivalente a re.search(r'\s+(MG|V)\s+\d{4}\s*$', line) para linhas já sem espaços nas pontas
+    parts = line.rsplit(None, 2)
+    return len(parts) == 3 and parts[1] in ('MG', 'V') and len(parts[2]) == 4 and parts[2].isdecimal()
+
+
+def _split_tail(route_block):
+    """Remove operador (4 letras) e pista (07/25) do fim do bloco de rota."""
+    responsavel = None
+    pista = None
+    tail = route_block[-4:]
+    # [A-Z]{4}: quatro letras ASCII maiúsculas
+    if len(route_block) >= 5 and route_block[-5].isspace() and tail.isascii() and tail.isalpha() and tail.isupper():
+        responsavel = tail
+        route_block = route_block[:-5].rstrip()
+    if len(route_block) >= 3 and route_block[-3].isspace() and route_block[-2:] in _PISTAS:
+        pista = route_block[-2:]
+        route_block = route_block[:-3].rstrip()
+    return route_block, responsavel, pista
+
+
+def _flight_rule(route_block):
+    iv = route_block.find('IV')
+    vv = route_block.find('VV')
+    if iv < 0 and vv < 0:
+        return None
+    if vv < 0 or (0 <= iv < vv):
+        return 'IFR'
+    return 'VFR'
+
+
+@functools.lru_cache(maxsize=4096)
+def _date_prefix(date_str_header):
+    """'ddmmyy' -> 'YYYY-MM-DDT', calculado uma vez por cabeçalho distinto.
+
+    Só aceita a forma canónica (6 dígitos ASCII, dia 01-31, mês 01-12, data existente), em que o
+    strptime lê exatamente dois dígitos por campo; para tudo o resto devolve None.
+    """
+    if len(date_str_header) != 6 or not _ASCII_DIGITS.issuperset(date_str_header):
+        return None
+    day, month, year = int(date_str_header[0:2]), int(date_str_header[2:4]), int(date_str_header[4:6])
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return None
+    # Mesma regra do %y: 69-99 -> 19xx, 00-68 -> 20xx
+    year += 2000 if year <= 68 else 1900
+    try:
+        date(year, month, day)
+    except ValueError:
+        return None
+    return f"{year:04d}-{month:02d}-{day:02d}T"
+
+
+def build_timestamp(date_str_header, horario_str):
+    """Equivalente a datetime.strptime(header + horario, '%d%m%y%H%M').isoformat() + 'Z'.
+
+    Os casos não canónicos (horas/minutos inválidos, dígitos fora do ASCII, etc.) seguem pelo
+    strptime, que aceita ou rejeita exatamente como antes.
+    """
+    prefix = _date_prefix(date_str_header)
+    suffix = _TIME_SUFFIXES.get(horario_str)
+    if prefix is None or suffix is None:
+        return datetime.strptime(f"{date_str_header}{horario_str}", '%d%m%y%H%M').isoformat() + 'Z'
+    return prefix + suffix
+
+
+def parse_line(line, icao_code):
+    """Converte uma linha (já sem espaços nas pontas) num registo, ou None se não for um movimento."""
+    if not line or len(line) < 25 or _is_summary_line(line):
+        return None
+    record = {'timestamp': None, 'matricula': 'N/A', 'tipo_aeronave': 'N/A', 'origem': 'N/A', 'destino': 'N/A', 'regra_voo': 'N/A', 'pista': '', 'responsavel': 'N/A', 'flight_class': 'N/A', 'aerodromo': icao_code}
+    date_str_header = line[9:15]
+    match = _HEADER_RE.match(line[15:].strip())
+    if not match:
+        return None
+    group = match.group
+    alt = match.lastgroup[1:]
+    record['matricula'] = group('m' + alt)
+    if alt == '4':
+        record['tipo_aeronave'] = group('t4'); record['flight_class'] = group('c4')
+    else:
+        type_class_str = group('tc' + alt)
+        record['tipo_aeronave'] = type_class_str[:-1]; record['flight_class'] = type_class_str[-1]
+    route_block, responsavel, pista = _split_tail(group('r' + alt).strip())
+    if responsavel: record['responsavel'] = responsavel
+    if pista: record['pista'] = pista
+    regra = _flight_rule(route_block)
+    if regra: record['regra_voo'] = regra
+    horario_str = ''
+    route_match = _ROUTE_RE.search(route_block)
+    if route_match is None:
+        record['origem'], record['destino'] = icao_code, icao_code
+    else:
+        wp1, horario, wp2, time_only = route_match.groups()
+        if time_only is not None:
+            record['origem'], record['destino'] = icao_code, icao_code
+            horario_str = time_only
+        elif wp2 is not None:
+            record['destino'], record['origem'] = wp1, wp2
+            horario_str = horario
+        else:
+            record['origem'], record['destino'] = icao_code, wp1
+            horario_str = horario
+    if horario_str:
+        record['timestamp'] = build_timestamp(date_str_header, horario_str)
+    return record
+
+
+def iter_decoded_lines(stream, encoding='utf-8', chunk_size=READ_CHUNK_SIZE):
+    """Lê um stream binário em blocos e devolve as linhas já decodificadas, uma a uma.
+
+    Equivale a stream.read().decode(encoding, errors='ignore').split('\n'), mas só mantém
+    em memória um bloco de leitura e a linha incompleta que ficou no fim dele.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        yield from lines
+    yield pending + decoder.decode(b'', final=True)
+
+
+def iter_records(lines, icao_code, stats=None):
+    """Gera os registos à medida que as linhas chegam; aceita qualquer iterável de linhas.
+
+    Com stats (dict), acrescenta no fim o número de linhas lidas ('lines') e rejeitadas por erro ('rejected').
+    """
+    total = rejected = 0
+    try:
+        for total, line in enumerate(lines, 1):
+            line = line.strip()
+            try:
+                record = parse_line(line, icao_code)
+            except Exception as e:
+                print(f"ERRO ao processar linha: '{line}'. Erro: {e}")
+                rejected += 1
+                continue
+            if record is not None:
+                yield record
+    finally:
+        if stats is not None:
+            stats['lines'] = stats.get('lines', 0) + total
+            stats['rejected'] = stats.get('rejected', 0) + rejected
+
+
+def parse_data_file(file_content, icao_code, compact=False, line_stats=None):
+    # Aceita o conteúdo completo (str) ou qualquer iterável de linhas (ex.: iter_decoded_lines).
+    # Com compact=True os registos vêm num RecordBatch em vez de uma lista de dicionários.
+    # line_stats (dict) recebe as contagens de linhas: parsed (com registo), skipped (vazias, resumos, sem
+    # movimento) e rejected (erro no parsing).
+    lines = file_content.split('\n') if isinstance(file_content, str) else file_content
+    records = RecordBatch() if compact else []
+    data_date_from_file = None
+    counts = {} if line_stats is not None else None
+    for record in iter_records(lines, icao_code, counts):
+        if data_date_from_file is None and record['timestamp']:
+            data_date_from_file = record['timestamp']
+        records.append(record)
+    if line_stats is not None:
+        add_line_stats(line_stats, {'parsed': len(records), 'rejected': counts['rejected'],
+                                    'skipped': counts['lines'] - len(records) - counts['rejected']})
+    return {"records": records, "icao_code": icao_code, "data_date": data_date_from_file}
+
+
+def add_line_stats(total, stats):
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def split_at_lines(data, target_size=PARALLEL_SPLIT_BYTES):
+    """Divide bytes em pedaços de ~target_size, sempre logo a seguir a um '\n'.
+
+    O byte '\n' nunca faz parte de uma sequência UTF-8 multibyte, por isso cada pedaço
+    decodifica de forma independente e a junção dos resultados é igual à do ficheiro inteiro.
+    """
+    start = 0
+    while len(data) - start > target_size:
+        cut = data.find(b'\n', start + target_size)
+        if cut < 0:
+            break
+        yield data[start:cut + 1]
+        start = cut + 1
+    yield data[start:]
+
+
+def parse_bytes(data, icao_code):
+    # Ponto de entrada dos processos do pool (tem de ser uma função de módulo para ser serializável);
+    # as contagens de linhas voltam com o resultado, em 'line_stats'
+    line_stats = {}
+    parsed = parse_data_file(data.decode('utf-8', errors='ignore'), icao_code, compact=True, line_stats=line_stats)
+    parsed['line_stats'] = line_stats
+    return parsed
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        # 'spawn' evita herdar threads e ligações abertas do processo do servidor
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        _executor_workers = workers
+    return _executor
+
+
+def parse_files_parallel(files, workers, split_bytes=PARALLEL_SPLIT_BYTES):
+    """Processa [(file_name, icao_code, data_bytes), ...] num pool de processos.
+
+    Devolve [(file_name, parsed_data ou exceção), ...] pela ordem original dos ficheiros, com os
+    registos em RecordBatch (mais baratos de serializar entre processos).
+    """
+    global _executor
+    executor = _get_executor(workers)
+    pending = [(file_name, icao_code, [executor.submit(parse_bytes, piece, icao_code) for piece in split_at_lines(data, split_bytes)])
+               for file_name, icao_code, data in files]
+    results = []
+    for file_name, icao_code, futures in pending:
+        try:
+            parts = [future.result() for future in futures]
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and _executor is executor:
+                _executor = None  # um pool partido não aceita mais tarefas; o próximo upload cria outro
+            results.append((file_name, e))
+            continue
+        records = RecordBatch()
+        line_stats = {}
+        for part in parts:
+            records.extend(part['records'])
+            add_line_stats(line_stats, part['line_stats'])
+        data_date = next((part['data_date'] for part in parts if part['data_date']), None)
+        results.append((file_name, {"records": records, "icao_code": icao_code, "data_date": data_date, "line_stats": line_stats}))
+    return results
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import json
+import sys
+import zlib
+from array import array
+
+# Ordem das chaves de cada registo, igual à do dicionário criado pelo parser
+FIELDS = ('timestamp', 'matricula', 'tipo_aeronave', 'origem', 'destino', 'regra_voo', 'pista', 'responsavel', 'flight_class', 'aerodromo')
+PACK_VERSION = 1
+
+
+class RecordBatch:
+    """Armazenamento colunar e compacto de movimentos.
+
+    Cada campo é codificado por dicionário: os valores distintos são guardados uma única vez
+    e cada registo ocupa apenas um código de 4 bytes por coluna. Os dicionários no formato da
+    API só são recriados na fronteira (to_dicts / iteração).
+    """
+    __slots__ = ('_codes', '_values', '_index')
+
+    def __init__(self, records=()):
+        self._codes = {field: array('I') for field in FIELDS}
+        self._values = {field: [] for field in FIELDS}
+        self._index = {field: {} for field in FIELDS}
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self._codes['timestamp'])
+
+    def __iter__(self):
+        # Recria os dicionários um a um, sem materializar a lista inteira
+        values = [self._values[field] for field in FIELDS]
+        for row in zip(*(self._codes[field] for field in FIELDS)):
+            yield {field: column[code] for field, column, code in zip(FIELDS, values, row)}
+
+    def __eq__(self, other):
+        # Igualdade pelos registos, não pela codificação: os códigos dependem da ordem de inserção
+        if not isinstance(other, RecordBatch):
+            return NotImplemented
+        return len(self) == len(other) and all(self.column(field) == other.column(field) for field in FIELDS)
+
+    __hash__ = None
+
+    def __getstate__(self):
+        # Os índices reconstroem-se a partir dos valores; não vale a pena serializá-los
+        return self._codes, self._values
+
+    def __setstate__(self, state):
+        self._codes, self._values = state
+        self._index = {field: {value: code for code, value in enumerate(values)} for field, values in self._values.items()}
+
+    def _encode(self, field, value):
+        index = self._index[field]
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(self._values[field])
+            self._values[field].append(value)
+        return code
+
+    def append(self, record):
+        for field in FIELDS:
+            self._codes[field].append(self._encode(field, record.get(field)))
+
+    def extend(self, other):
+        if isinstance(other, RecordBatch):
+            # Traduz os códigos do outro lote para os dicionários deste
+            for field in FIELDS:
+                translate = [self._encode(field, value) for value in other._values[field]]
+                self._codes[field].extend(translate[code] for code in other._codes[field])
+        else:
+            for record in other:
+                self.append(record)
+
+    def column(self, field):
+        values = self._values[field]
+        return [values[code] for code in self._codes[field]]
+
+    def distinct(self, field):
+        """Valores distintos de uma coluna (sem percorrer os registos)."""
+        return list(self._values[field])
+
+    def codes(self, field):
+        """Códigos da coluna, um por registo; o código é a posição do valor em distinct(field)."""
+        return self._codes[field]
+
+    def take(self, rows):
+        """Dicionários dos registos nas posições indicadas, pela ordem dada."""
+        columns = [(field, self._values[field], self._codes[field]) for field in FIELDS]
+        return [{field: values[codes[row]] for field, values, codes in columns} for row in rows]
+
+    def approx_bytes(self):
+        """Memória aproximada ocupada pelo lote (códigos, valores distintos e índices dos dicionários)."""
+        total = sys.getsizeof(self)
+        for field in FIELDS:
+            codes = self._codes[field]
+            total += sys.getsizeof(codes) + sys.getsizeof(self._values[field]) + sys.getsizeof(self._index[field])
+            total += sum(sys.getsizeof(value) for value in self._values[field])
+        return total
+
+    def to_dicts(self):
+        columns = [self.column(field) for field in FIELDS]
+        return [dict(zip(FIELDS, row)) for row in zip(*columns)]
+
+    def slice(self, start, stop):
+        """Novo lote com os registos [start:stop], com dicionários só dos valores usados."""
+        part = RecordBatch()
+        for field in FIELDS:
+            values = self._values[field]
+            part._codes[field].extend(part._encode(field, values[code]) for code in self._codes[field][start:stop])
+        return part
+
+    def pack(self):
+        """Serializa o lote (dicionários + códigos por coluna) em bytes comprimidos."""
+        payload = {
+            'v': PACK_VERSION,
+            'values': [self._values[field] for field in FIELDS],
+            'codes': [self._codes[field].tolist() for field in FIELDS],
+        }
+        return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'), 6)
+
+    @classmethod
+    def unpack(cls, data):
+        payload = json.loads(zlib.decompress(data))
+        batch = cls.__new__(cls)
+        batch.__setstate__((
+            {field: array('I', codes) for field, codes in zip(FIELDS, payload['codes'])},
+            {field: values for field, values in zip(FIELDS, payload['values'])},
+        ))
+        return batch
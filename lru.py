@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Dicionário LRU partilhado entre threads, limitado em bytes (max_bytes) e/ou em entradas (max_entries).
+
+    Base das caches da aplicação (tokens, parser, análises, listagens): cada uma escolhe a chave, o
+    valor e o tamanho de cada entrada (1 por omissão, quando só conta o número de entradas).
+    """
+
+    def __init__(self, max_bytes=None, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # chave -> (valor, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, valid=None):
+        """Valor guardado em key, ou None. Uma entrada em que valid(valor) é falso conta como falha e sai da cache."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and valid is not None and not valid(entry[0]):
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, key):
+        """Como get, mas sem contar acertos nem falhas (p.ex. para completar uma entrada já guardada)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size=1):
+        """Guarda value em key, despejando as entradas usadas há mais tempo. Devolve False se não couber."""
+        with self._lock:
+            self._discard(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while ((self.max_bytes is not None and self._bytes > self.max_bytes)
+                   or (self.max_entries is not None and len(self._entries) > self.max_entries)):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            return True
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def pop(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def pop_where(self, predicate):
+        """Remove as entradas cuja chave cumpre predicate(chave)."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+            if self.max_bytes is not None:
+                stats.update(bytes=self._bytes, maxBytes=self.max_bytes)
+            if self.max_entries is not None:
+                stats['maxEntries'] = self.max_entries
+            return stats
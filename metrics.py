@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+# Métricas em memória do processo, expostas em /metrics no formato de texto do Prometheus.
+# Com METRICS_ENABLED=0 as funções de registo não fazem nada e a rota não existe.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# Limites (em segundos) dos histogramas de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monotónico, com um valor por combinação de etiquetas."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _label_text(self.labels, label_values), value
+
+
+class Histogram:
+    """Histograma cumulativo (buckets, soma e contagem), com um conjunto por combinação de etiquetas."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # etiquetas -> [contagens por bucket (+Inf no fim), soma]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][position] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(counts), total)) for k, (counts, total) in self._values.items())
+        for label_values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _number(bound)
+                yield f"{self.name}_bucket", _label_text(self.labels + ('le',), label_values + (le,)), cumulative
+            yield f"{self.name}_sum", _label_text(self.labels, label_values), total
+            yield f"{self.name}_count", _label_text(self.labels, label_values), cumulative
+
+
+class GaugeCallback:
+    """Valores lidos na altura da recolha, p.ex. as estatísticas das caches: func() -> {etiqueta: valor}."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, label, func):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.func = func
+
+    def samples(self):
+        try:
+            values = self.func()
+        except Exception as e:
+            print(f"AVISO: Falha ao recolher a métrica {self.name}: {e}")
+            return
+        for key, value in sorted(values.items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield self.name, _label_text((self.label,), (key,)), value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def gauge_callback(self, name, documentation, label, func):
+        with self._lock:
+            self._metrics[name] = GaugeCallback(name, documentation, label, func)
+
+    def render(self):
+        """Todas as métricas no formato de exposição de texto do Prometheus (versão 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram('http_request_duration_seconds', "Duração dos pedidos HTTP por rota.", ('endpoint', 'method', 'status'))
+REQUEST_BYTES = registry.counter('http_request_bytes_total', "Bytes recebidos no corpo dos pedidos.", ('endpoint',))
+RESPONSE_BYTES = registry.counter('http_response_bytes_total', "Bytes enviados no corpo das respostas.", ('endpoint',))
+STAGE_DURATION = registry.histogram('pipeline_stage_duration_seconds', "Duração de cada etapa do processamento.", ('stage',))
+PARSER_LINES = registry.counter('parser_lines_total', "Linhas lidas pelo parser, por resultado (parsed, skipped, rejected).", ('result',))
+RECORDS_WRITTEN = registry.counter('records_written_total', "Registos gravados no armazenamento.")
+FIRESTORE_OPERATIONS = registry.counter('firestore_operations_total', "Documentos lidos, escritos e apagados no Firestore.", ('op',))
+FIRESTORE_COMMITS = registry.counter('firestore_commits_total', "Commits enviados ao Firestore.")
+FIRESTORE_RETRIES = registry.counter('firestore_retries_total', "Commits repetidos após um erro transitório.")
+
+
+def inc(counter, amount=1, *label_values):
+    if METRICS_ENABLED and amount:
+        counter.inc(amount, *label_values)
+
+
+def observe(histogram, value, *label_values):
+    if METRICS_ENABLED:
+        histogram.observe(value, *label_values)
+
+
+@contextmanager
+def _timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage)
+
+
+def timed(stage):
+    """Mede a duração do bloco na etapa 'stage'; sem métricas devolve um contexto vazio partilhado."""
+    return _timed(stage) if METRICS_ENABLED else _NULL_CONTEXT
+
+
+def count_parser_lines(line_stats):
+    if METRICS_ENABLED and line_stats:
+        for result in ('parsed', 'skipped', 'rejected'):
+            inc(PARSER_LINES, line_stats.get(result, 0), result)
+
+
+def _count_body(chunks, endpoint):
+    # Respostas em fluxo: os bytes são contados à medida que saem
+    total = 0
+    try:
+        for chunk in chunks:
+            total += len(chunk)
+            yield chunk
+    finally:
+        RESPONSE_BYTES.inc(total, endpoint)
+
+
+def init_app(app, stats_sources=None):
+    """Regista os hooks de tempo por pedido e a rota /metrics (protegida por METRICS_TOKEN, se definido).
+
+    stats_sources: {nome: função que devolve um dict de estatísticas}, p.ex. as das caches.
+    """
+    if not METRICS_ENABLED:
+        return
+    from flask import Response, g, request
+
+    for name, func in (stats_sources or {}).items():
+        registry.gauge_callback(f"{name}_stats", f"Estatísticas de {name}.", 'stat', func)
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'not_found'
+        REQUEST_DURATION.observe(time.perf_counter() - start, endpoint, request.method, str(response.status_code))
+        if request.content_length:
+            REQUEST_BYTES.inc(request.content_length, endpoint)
+        if response.is_streamed:
+            response.response = _count_body(response.response, endpoint)
+        elif response.content_length:
+            RESPONSE_BYTES.inc(response.content_length, endpoint)
+        return response
+
+    token = os.environ.get('METRICS_TOKEN')
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return Response("Não autorizado\n", status=401, mimetype='text/plain')
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import threading
+
+from flight_parser import PARSER_VERSION, READ_CHUNK_SIZE
+from flight_records import RecordBatch
+from lru import LRUCache
+
+# Cache dos resultados do parser, por conteúdo do ficheiro: em memória (LRU limitada em bytes) e,
+# opcionalmente, em disco (PARSE_CACHE_DIR), para sobreviver a reinícios e ser partilhada entre workers
+PARSE_CACHE_MAX_BYTES = int(os.environ.get('PARSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+PARSE_CACHE_DIR = os.environ.get('PARSE_CACHE_DIR')
+PARSE_CACHE_DISK_MAX_BYTES = int(os.environ.get('PARSE_CACHE_DISK_MAX_BYTES', 1024 * 1024 * 1024))
+
+
+def hash_stream(stream, chunk_size=READ_CHUNK_SIZE):
+    """SHA-256 do conteúdo de um stream binário, lido em blocos; o stream volta ao início."""
+    digest = hashlib.sha256()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def _encode(parsed_data):
+    # Cabeçalho JSON numa linha seguido do RecordBatch comprimido (ver RecordBatch.pack)
+    header = json.dumps({'icao_code': parsed_data['icao_code'], 'data_date': parsed_data['data_date']})
+    return header.encode('utf-8') + b'\n' + parsed_data['records'].pack()
+
+
+def _decode(data):
+    header, packed = data.split(b'\n', 1)
+    parsed_data = json.loads(header)
+    parsed_data['records'] = RecordBatch.unpack(packed)
+    return parsed_data
+
+
+class DiskCache:
+    """Entradas (bytes) em ficheiros numa pasta partilhada entre processos, limitada em bytes.
+
+    A data de modificação de cada ficheiro serve de "último acesso": acima do limite apagam-se as
+    entradas usadas há mais tempo até ficar em 80% dele.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._bytes = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.bin')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    @staticmethod
+    def _size(path):
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    def _removed(self, size):
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes = max(0, self._bytes - size)
+
+    def _remove(self, path):
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        self._removed(size)
+
+    def put(self, key, data):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escreve num ficheiro temporário e troca, para outro processo nunca ler uma entrada a meio
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            replaced = self._size(path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"AVISO: Não foi possível gravar a cache em disco ({self.directory}): {e}")
+            return
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, _, size in self._files())
+            else:
+                # Uma entrada substituída deixa de contar
+                self._bytes += len(data) - replaced
+            if self._bytes > self.max_bytes:
+                self._prune()
+
+    def delete_prefix(self, prefix):
+        """Apaga todas as entradas cuja chave começa por prefix (com pelo menos 2 caracteres)."""
+        folder = os.path.dirname(self._path(prefix))
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(prefix) and name.endswith('.bin'):
+                self._remove(os.path.join(folder, name))
+
+    def _files(self):
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.bin'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_mtime, st.st_size
+
+    def _prune(self):
+        files = sorted(self._files(), key=lambda f: f[1])
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.max_bytes * 0.8:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._bytes = total
+
+
+class ParseCache:
+    """Resultados de parse_data_file indexados por (hash do ficheiro, ICAO, PARSER_VERSION).
+
+    As entradas são guardadas já comprimidas, por isso o limite em bytes é exato e o mesmo
+    formato serve para o disco. Cada acerto devolve um RecordBatch novo.
+    """
+
+    def __init__(self, max_bytes=PARSE_CACHE_MAX_BYTES, disk_dir=PARSE_CACHE_DIR, disk_max_bytes=PARSE_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.memory = LRUCache(max_bytes=max_bytes)
+        self.disk = DiskCache(disk_dir, disk_max_bytes) if disk_dir else None
+        self.disk_hits = 0
+
+    @staticmethod
+    def key(file_hash, icao_code):
+        return f"{file_hash}-{icao_code}-v{PARSER_VERSION}"
+
+    def get(self, key):
+        data = self.memory.get(key)
+        if data is None and self.disk:
+            data = self.disk.get(key)
+            if data is not None:
+                self.disk_hits += 1
+                self.memory.put(key, data, len(data))
+        if data is None:
+            return None
+        return _decode(data)
+
+    def put(self, key, parsed_data):
+        data = _encode(parsed_data)
+        self.memory.put(key, data, len(data))
+        if self.disk:
+            self.disk.put(key, data)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self):
+        return tiered_stats(self.memory.stats(), self.disk_hits)
+
+
+def tiered_stats(memory_stats, disk_hits):
+    """Estatísticas de uma cache em memória com um DiskCache por trás: as falhas da memória resolvidas
+    pelo disco contam como diskHits e não como misses."""
+    stats = dict(memory_stats, diskHits=disk_hits, misses=memory_stats['misses'] - disk_hits)
+    lookups = stats['hits'] + stats['misses'] + disk_hits
+    stats['hitRate'] = round((stats['hits'] + disk_hits) / lookups, 4) if lookups else 0.0
+    return stats
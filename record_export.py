@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+from itertools import islice
+
+from flight_records import FIELDS
+
+# Colunas e cabeçalhos do CSV, os mesmos do botão "Download CSV" do painel
+CSV_COLUMNS = (
+    ('aerodromo', 'Aerodromo'), ('timestamp', 'Data/Hora'), ('matricula', 'Matrícula'),
+    ('tipo_aeronave', 'Tipo Aeronave'), ('flight_class', 'Tipo Voo'), ('origem', 'Origem'),
+    ('destino', 'Destino'), ('regra_voo', 'Regra'), ('pista', 'Pista'),
+)
+CSV_ROWS_PER_CHUNK = 1000
+PARQUET_ROWS_PER_GROUP = 50000
+
+
+def iter_csv(records, rows_per_chunk=CSV_ROWS_PER_CHUNK):
+    """CSV (com aspas onde for preciso) gerado aos bocados, sem montar o ficheiro inteiro em memória."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow([header for _, header in CSV_COLUMNS])
+    records = iter(records)
+    while True:
+        rows = [[rec.get(field) or '' for field, _ in CSV_COLUMNS] for rec in islice(records, rows_per_chunk)]
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        if len(rows) < rows_per_chunk:
+            return
+
+
+class _StreamSink:
+    """Destino de escrita para o ParquetWriter cujos bytes vão sendo recolhidos e enviados."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_parquet(records, rows_per_group=PARQUET_ROWS_PER_GROUP):
+    """Parquet gerado um row group de cada vez: só um grupo de registos está em memória.
+
+    O timestamp é gravado como timestamp UTC e as restantes colunas como texto codificado por dicionário.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (field, pa.timestamp('s', tz='UTC') if field == 'timestamp' else pa.dictionary(pa.int32(), pa.string()))
+        for field in FIELDS
+    ])
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    records = iter(records)
+    while True:
+        group = list(islice(records, rows_per_group))
+        if group:
+            columns = {}
+            for field in FIELDS:
+                values = pa.array([rec.get(field) for rec in group], type=pa.string())
+                if field == 'timestamp':
+                    columns[field] = pc.strptime(values, format='%Y-%m-%dT%H:%M:%SZ', unit='s', error_is_null=True)
+                else:
+                    columns[field] = pc.dictionary_encode(values)
+            writer.write_table(pa.table(columns).cast(schema))
+            yield sink.drain()
+        if len(group) < rows_per_group:
+            break
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Colunas pesquisáveis, as mesmas dos filtros da tabela em templates/index.html
+SEARCH_FIELDS = ('aerodromo', 'timestamp', 'matricula', 'tipo_aeronave', 'flight_class', 'origem', 'destino', 'regra_voo', 'pista')
+# Limite de valores memorizados por coluna no filtro em fluxo (os timestamps podem ser quase todos distintos)
+MAX_FILTER_CACHE = 10000
+
+
+def format_timestamp(ts):
+    # Mesmo texto que formatDateTime() mostra na tabela (dd/mm/aaaa, hh:mm), para o filtro de data/hora
+    if not ts or len(ts) < 16:
+        return ''
+    return f"{ts[8:10]}/{ts[5:7]}/{ts[0:4]}, {ts[11:13]}:{ts[14:16]}"
+
+
+def search_key(field, value):
+    """Texto de um valor comparado com os filtros (em maiúsculas)."""
+    if field == 'timestamp':
+        return format_timestamp(value).upper()
+    return str(value).upper() if value is not None else ''
+
+
+def make_record_filter(filters=None, start_ts=None, end_ts=None, prefix=False):
+    """Predicado sobre um registo com a mesma semântica de RecordIndex.search, para filtrar em fluxo
+    (sem índice). Devolve None quando não há filtros."""
+    filters = [(field, text.upper()) for field, text in (filters or {}).items() if text]
+    if not filters and not (start_ts or end_ts):
+        return None
+    # Os valores repetem-se muito (aeródromos, tipos, regras): cada valor distinto é avaliado uma só vez
+    seen = {field: {} for field, _ in filters}
+
+    def matches(record):
+        ts = record.get('timestamp')
+        if (start_ts or end_ts) and not (ts and (not start_ts or start_ts <= ts) and (not end_ts or ts <= end_ts)):
+            return False
+        for field, text in filters:
+            value = record.get(field)
+            cache = seen[field]
+            result = cache.get(value)
+            if result is None:
+                key = search_key(field, value)
+                result = key.startswith(text) if prefix else text in key
+                if len(cache) < MAX_FILTER_CACHE:
+                    cache[value] = result
+            if not result:
+                return False
+        return True
+    return matches
+
+
+class RecordIndex:
+    """Índices invertidos de uma análise, construídos uma vez a partir de um RecordBatch.
+
+    Como o lote já é codificado por dicionário, cada coluna tem uma lista de posições por valor
+    distinto: um filtro só percorre os valores distintos (milhares) e não os registos (milhões).
+    Os registos também ficam ordenados por timestamp, para intervalos de datas por bisseção e
+    para devolver os resultados pela ordem da tabela (mais recentes primeiro).
+    """
+
+    def __init__(self, batch):
+        self.batch = batch
+        self._keys = {}
+        self._sorted_keys = {}
+        self._postings = {}
+        for field in SEARCH_FIELDS:
+            values = batch.distinct(field)
+            keys = [search_key(field, v) for v in values]
+            postings = [array('I') for _ in values]
+            for row, code in enumerate(batch.codes(field)):
+                postings[code].append(row)
+            self._keys[field] = keys
+            self._sorted_keys[field] = sorted((k, code) for code, k in enumerate(keys))
+            self._postings[field] = postings
+
+        # Ordem da tabela (timestamp decrescente; empates pela ordem original, como o sort estável do
+        # JavaScript): as listas de posições de cada timestamp distinto, do mais recente para o mais antigo
+        timestamps = batch.distinct('timestamp')
+        by_time = sorted(range(len(timestamps)), key=lambda code: timestamps[code] or '', reverse=True)
+        self._order = array('I')
+        self._time_starts = []
+        for code in by_time:
+            self._time_starts.append(len(self._order))
+            self._order.extend(self._postings['timestamp'][code])
+        self._time_starts.append(len(self._order))
+        # Valores em ordem crescente, para a bisseção dos intervalos de datas
+        self._time_values = [timestamps[code] or '' for code in reversed(by_time)]
+        self._rank = array('I', bytes(4 * len(batch)))
+        for position, row in enumerate(self._order):
+            self._rank[row] = position
+
+    def __len__(self):
+        return len(self.batch)
+
+    def approx_bytes(self):
+        """Memória aproximada dos índices, sem o lote (que é partilhado com a analysis_cache)."""
+        total = sum(sys.getsizeof(a) for a in (self._order, self._rank, self._time_starts, self._time_values))
+        for field in SEARCH_FIELDS:
+            keys = self._keys[field]
+            total += sys.getsizeof(keys) + sum(sys.getsizeof(key) for key in keys)
+            # Os tuplos (texto, código) da lista ordenada partilham os textos de keys
+            total += sys.getsizeof(self._sorted_keys[field]) + len(keys) * sys.getsizeof((None, None))
+            postings = self._postings[field]
+            total += sys.getsizeof(postings) + sum(sys.getsizeof(p) for p in postings)
+        return total
+
+    def _matching_codes(self, field, text, prefix):
+        text = text.upper()
+        if prefix:
+            sorted_keys = self._sorted_keys[field]
+            start = bisect_left(sorted_keys, (text,))
+            codes = []
+            for key, code in sorted_keys[start:]:
+                if not key.startswith(text):
+                    break
+                codes.append(code)
+            return codes
+        return [code for code, key in enumerate(self._keys[field]) if text in key]
+
+    def search(self, filters=None, start_ts=None, end_ts=None, prefix=False):
+        """Posições dos registos que cumprem todos os filtros, do mais recente para o mais antigo.
+
+        filters: {coluna: texto}; o texto tem de estar contido no valor (ou ser o seu início, com
+        prefix=True), sem distinguir maiúsculas, como nos filtros da tabela.
+        start_ts/end_ts: limites (inclusivos) do timestamp, no formato ISO dos registos.
+        """
+        candidates = []
+        masks = []
+        for field, text in (filters or {}).items():
+            if not text:
+                continue
+            codes = self._matching_codes(field, text, prefix)
+            if not codes:
+                return []
+            if len(codes) == len(self._keys[field]):
+                # Todos os valores da coluna servem: o filtro não exclui nada
+                continue
+            postings = self._postings[field]
+            size = sum(len(postings[code]) for code in codes)
+            candidates.append((size, field, codes))
+            mask = bytearray(len(postings))
+            for code in codes:
+                mask[code] = 1
+            masks.append((field, self.batch.codes(field), mask))
+
+        time_range = None
+        if start_ts or end_ts:
+            values = self._time_values
+            # Registos sem timestamp ('') ficam fora de qualquer intervalo
+            low = max(bisect_left(values, start_ts) if start_ts else 0, bisect_right(values, ''))
+            high = max(low, bisect_right(values, end_ts) if end_ts else len(values))
+            # Os grupos [low, high) em ordem crescente são os grupos [n - high, n - low) na ordem da tabela
+            n = len(values)
+            time_range = (self._time_starts[n - high], self._time_starts[n - low])
+            if time_range[0] >= time_range[1]:
+                return []
+            candidates.append((time_range[1] - time_range[0], None, time_range))
+
+        if not candidates:
+            return self._order.tolist()
+
+        # Parte-se do conjunto mais pequeno e verifica-se cada posição nas máscaras dos restantes filtros
+        candidates.sort(key=lambda c: c[0])
+        size, field, selection = candidates[0]
+        if field is not None and size * 4 > len(self._order):
+            # Filtros pouco seletivos: é mais rápido percorrer a ordem da tabela e dispensar a ordenação final
+            rows = self._order[time_range[0]:time_range[1]] if time_range else self._order
+            for _, codes, mask in masks:
+                rows = [row for row in rows if mask[codes[row]]]
+            return rows if isinstance(rows, list) else rows.tolist()
+        if field is None:
+            low, high = selection
+            rows = self._order[low:high]
+        else:
+            postings = self._postings[field]
+            rows = [row for code in selection for row in postings[code]]
+        if field is not None and time_range is not None:
+            low, high = time_range
+            rank = self._rank
+            rows = [row for row in rows if low <= rank[row] < high]
+        for mask_field, codes, mask in masks:
+            if mask_field != field:
+                rows = [row for row in rows if mask[codes[row]]]
+        return sorted(rows, key=self._rank.__getitem__)
+
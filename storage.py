@@ -0,0 +1,520 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+
+from bulk_writer import BulkWriter
+from flight_records import FIELDS, RecordBatch
+import metrics
+
+# Backend do armazenamento das análises: 'firestore' (por omissão) ou 'sqlite' (ficheiro local ou ':memory:')
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'firestore')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', 'trafego.db')
+
+# Armazenamento "packed" no Firestore: registos em documentos 'chunks' com alguns milhares de linhas cada,
+# em colunas comprimidas, bem abaixo do limite de 1 MiB por documento do Firestore
+PACKED_CHUNK_ROWS = 5000
+PACKED_CHUNK_MAX_BYTES = 900 * 1024
+# Número máximo de commits em paralelo ao gravar ou apagar uma análise no Firestore
+FIRESTORE_MAX_IN_FLIGHT = int(os.environ.get('FIRESTORE_MAX_IN_FLIGHT', 8))
+# De quantos em quantos documentos/linhas apagados se reporta o progresso de uma remoção
+PURGE_PROGRESS_EVERY = 2000
+# Acréscimo em curso numa análise do Firestore: a marca appendStartedAt deixa de bloquear ao fim deste
+# tempo (s), para uma análise não ficar presa se o processo que a escrevia morrer a meio
+APPEND_LOCK_TIMEOUT = 15 * 60
+
+
+def _firestore():
+    # firebase_admin.firestore (google-cloud-firestore e gRPC) só é importado quando o backend Firestore é usado
+    from firebase_admin import firestore
+    return firestore
+
+
+def in_range(rec, start_ts, end_ts):
+    ts = rec.get('timestamp')
+    return bool(ts) and start_ts <= ts <= end_ts
+
+
+class AppendConflict(Exception):
+    """A análise mudou desde que os metadados foram lidos, ou outro acréscimo ainda está a ser gravado."""
+
+
+class UploadStorage(ABC):
+    """Interface do armazenamento das análises; as rotas de app.py só falam com esta interface.
+
+    Uma análise é um dicionário de metadados (userId, analysisName, recordCount, startDate, endDate, ...)
+    com os seus registos e rollups por aeródromo. As posições devolvidas por iter_records são valores
+    JSON que servem de cursor para retomar a leitura.
+    """
+
+    @abstractmethod
+    def create_upload(self, metadata, batch, rollups):
+        """Grava a análise (metadados, registos e rollups) e devolve o seu ID."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_upload(self, upload_id):
+        """Metadados da análise, ou None se não existir."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_uploads(self, user_id):
+        """[(upload_id, metadados)] das análises do utilizador, da mais recente para a mais antiga."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_uploads_page(self, user_id, fields, page_size, cursor=None):
+        """Uma página da listagem de list_uploads, só com os campos pedidos: ([(upload_id, {campo: valor})], cursor).
+
+        O cursor ([createdAt, upload_id] do último item, serializável em JSON) pede a página seguinte; None no fim.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_upload(self, upload_id, fields):
+        raise NotImplementedError
+
+    @abstractmethod
+    def append_records(self, upload_id, upload_data, batch, rollups, fields):
+        """Acrescenta os registos do lote à análise, substitui os rollups (se rollups não for None) e
+        atualiza os metadados com fields. Levanta AppendConflict se a versão da análise já não for a de
+        upload_data (outro acréscimo chegou primeiro); nesse caso nada é gravado."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_records(self, upload_id, upload_data, cursor=None):
+        """Pares (registo, posição seguinte), pela ordem de gravação, a partir do cursor."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def valid_cursor(self, upload_data, position):
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_records(self, upload_id, upload_data, start_ts=None, end_ts=None):
+        """RecordBatch com os registos da análise, opcionalmente só os do intervalo [start_ts, end_ts]."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def read_rollups(self, upload_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def purge_size(self, upload_data):
+        """Número aproximado de unidades (documentos, linhas) que purge_upload vai apagar."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def purge_upload(self, upload_id, on_progress=None):
+        """Apaga os registos, os rollups e por fim os metadados; on_progress recebe o número já apagado."""
+        raise NotImplementedError
+
+
+class FirestoreStorage(UploadStorage):
+    """flight_uploads/{id} com as subcoleções 'chunks' (formato 'packed'), 'records' (análises antigas,
+    um documento por registo) e 'rollups'."""
+
+    def __init__(self, client, max_in_flight=FIRESTORE_MAX_IN_FLIGHT):
+        self.client = client
+        self.max_in_flight = max_in_flight
+
+    def _upload_ref(self, upload_id):
+        return self.client.collection('flight_uploads').document(upload_id)
+
+    @staticmethod
+    def _stream(query):
+        # Cada documento devolvido conta como uma leitura do Firestore
+        for doc in query.stream():
+            metrics.inc(metrics.FIRESTORE_OPERATIONS, 1, 'read')
+            yield doc
+
+    @staticmethod
+    def _count_single_write(op='write'):
+        # set/update/delete fora do BulkWriter: um documento e um commit
+        metrics.inc(metrics.FIRESTORE_OPERATIONS, 1, op)
+        metrics.inc(metrics.FIRESTORE_COMMITS)
+
+    @staticmethod
+    def pack_chunks(batch, rows=None):
+        """Divide o lote em pedaços comprimidos; um pedaço demasiado grande é repartido ao meio."""
+        rows = rows or PACKED_CHUNK_ROWS
+        for start in range(0, len(batch), rows):
+            stop = min(start + rows, len(batch))
+            data = batch.slice(start, stop).pack()
+            if len(data) > PACKED_CHUNK_MAX_BYTES and stop - start > 1:
+                yield from FirestoreStorage.pack_chunks(batch.slice(start, stop), rows=max(1, (stop - start) // 2))
+            else:
+                yield data
+
+    def write_packed_records(self, writer, upload_ref, chunks, start_index=0):
+        """Envia os chunks (de pack_chunks) para flight_uploads/{id}/chunks, a partir do chunk start_index, e devolve quantos são.
+
+        Os IDs dos chunks são o próprio índice, por isso um commit repetido não duplica registos.
+        """
+        chunks_ref = upload_ref.collection('chunks')
+        chunk_count = 0
+        for index, data in enumerate(chunks, start_index):
+            writer.set(chunks_ref.document(f"{index:06d}"), {'index': index, 'data': data}, size=len(data))
+            chunk_count += 1
+        return chunk_count
+
+    def create_upload(self, metadata, batch, rollups):
+        upload_ref = self.client.collection('flight_uploads').document()
+        # Chunks e rollups seguem pelo BulkWriter, com vários commits em paralelo e repetição em caso de contenção
+        with BulkWriter(self.client, max_in_flight=self.max_in_flight) as writer:
+            chunk_count = self.write_packed_records(writer, upload_ref, self.pack_chunks(batch))
+            for index, rollup in enumerate(rollups):
+                writer.set(upload_ref.collection('rollups').document(f"{index:04d}"), rollup)
+        # O documento da análise só é criado no fim, já completo: um save interrompido (p.ex. timeout do
+        # gunicorn) não aparece nas listagens nem é lido pela metade; deixa apenas chunks órfãos
+        upload_ref.set(dict(metadata, createdAt=_firestore().SERVER_TIMESTAMP, storageFormat='packed',
+                            chunkCount=chunk_count, hasRollups=True))
+        self._count_single_write()
+        return upload_ref.id
+
+    def get_upload(self, upload_id):
+        upload_doc = self._upload_ref(upload_id).get()
+        metrics.inc(metrics.FIRESTORE_OPERATIONS, 1, 'read')
+        return upload_doc.to_dict() if upload_doc.exists else None
+
+    def list_uploads(self, user_id):
+        query = self.client.collection('flight_uploads').where('userId', '==', user_id).order_by('createdAt', direction=_firestore().Query.DESCENDING)
+        return [(doc.id, doc.to_dict()) for doc in self._stream(query)]
+
+    def list_uploads_page(self, user_id, fields, page_size, cursor=None):
+        descending = _firestore().Query.DESCENDING
+        # O ID desempata análises criadas no mesmo instante; select() evita transferir os metadados inteiros
+        query = (self.client.collection('flight_uploads').where('userId', '==', user_id)
+                 .order_by('createdAt', direction=descending).order_by('__name__', direction=descending)
+                 .select(list(fields) + ['createdAt']))
+        if cursor:
+            query = query.start_after({'createdAt': datetime.fromisoformat(cursor[0]), '__name__': cursor[1]})
+        # Lê-se um documento a mais só para saber se há mais páginas
+        docs = list(self._stream(query.limit(page_size + 1)))
+        page = [(doc.id, doc.to_dict()) for doc in docs[:page_size]]
+        next_cursor = None
+        if len(docs) > page_size:
+            last_id, last_data = page[-1]
+            next_cursor = [last_data['createdAt'].isoformat(), last_id]
+        return [(upload_id, {field: data.get(field) for field in fields}) for upload_id, data in page], next_cursor
+
+    def update_upload(self, upload_id, fields):
+        self._upload_ref(upload_id).update(fields)
+        self._count_single_write()
+
+    def _begin_append(self, upload_ref, upload_data):
+        """Marca a análise com appendStartedAt se continuar na versão de upload_data e sem outro acréscimo em curso.
+
+        A marca é gravada com a pré-condição de o documento não ter mudado desde a leitura, por isso dois
+        acréscimos simultâneos nunca passam ambos; o segundo recebe AppendConflict. Devolve os metadados atuais.
+        """
+        from google.api_core.exceptions import FailedPrecondition
+        snapshot = upload_ref.get()
+        metrics.inc(metrics.FIRESTORE_OPERATIONS, 1, 'read')
+        current = snapshot.to_dict() if snapshot.exists else None
+        if current is None or (current.get('version') or 1) != (upload_data.get('version') or 1):
+            raise AppendConflict(upload_ref.id)
+        if current.get('storageFormat') == 'packed' and current.get('chunkCount') is None:
+            # Análise incompleta: não se sabe onde continuar a numeração dos chunks
+            raise AppendConflict(upload_ref.id)
+        started = current.get('appendStartedAt')
+        if started and datetime.now(timezone.utc) - started < timedelta(seconds=APPEND_LOCK_TIMEOUT):
+            raise AppendConflict(upload_ref.id)
+        try:
+            upload_ref.update({'appendStartedAt': _firestore().SERVER_TIMESTAMP},
+                              option=self.client.write_option(last_update_time=snapshot.update_time))
+        except FailedPrecondition:
+            raise AppendConflict(upload_ref.id)
+        self._count_single_write()
+        return current
+
+    def append_records(self, upload_id, upload_data, batch, rollups, fields):
+        upload_ref = self._upload_ref(upload_id)
+        current = self._begin_append(upload_ref, upload_data)
+        fields = dict(fields, appendStartedAt=_firestore().DELETE_FIELD)
+        try:
+            with BulkWriter(self.client, max_in_flight=self.max_in_flight) as writer:
+                if current.get('storageFormat') == 'packed':
+                    # Os novos chunks continuam a numeração; os existentes não são tocados. Chunks de um
+                    # acréscimo falhado (índice >= chunkCount) não são lidos e são aqui reescritos
+                    start_index = current.get('chunkCount') or 0
+                    fields['chunkCount'] = start_index + self.write_packed_records(writer, upload_ref, self.pack_chunks(batch), start_index)
+                else:
+                    records_ref = upload_ref.collection('records')
+                    for rec in batch:
+                        writer.set(records_ref.document(), rec)
+                for index, rollup in enumerate(rollups or ()):
+                    writer.set(upload_ref.collection('rollups').document(f"{index:04d}"), rollup)
+            # Os metadados só mudam depois de os registos estarem gravados
+            upload_ref.update(fields)
+            self._count_single_write()
+        except Exception:
+            try:
+                upload_ref.update({'appendStartedAt': _firestore().DELETE_FIELD})
+                self._count_single_write()
+            except Exception as e:
+                print(f"AVISO: Não foi possível libertar o acréscimo ao upload {upload_id}: {e}")
+            raise
+
+    def valid_cursor(self, upload_data, position):
+        # [índice do chunk, registo dentro do chunk] nas análises 'packed'; ID do último documento nas antigas
+        if upload_data.get('storageFormat') == 'packed':
+            return isinstance(position, list) and len(position) == 2 and all(isinstance(n, int) and n >= 0 for n in position)
+        return isinstance(position, str) and bool(position)
+
+    def iter_records(self, upload_id, upload_data, cursor=None):
+        upload_ref = self._upload_ref(upload_id)
+        if upload_data.get('storageFormat') == 'packed':
+            start_index, start_offset = cursor or (0, 0)
+            # Só contam os chunks abaixo de chunkCount: os de um acréscimo em curso (ou falhado) ficam de fora
+            # até chunkCount os incluir, e uma análise sem chunkCount está incompleta e não devolve nada
+            chunk_count = upload_data.get('chunkCount') or 0
+            if start_index >= chunk_count:
+                return
+            query = upload_ref.collection('chunks').order_by('index')
+            if start_index:
+                query = query.where('index', '>=', start_index)
+            for doc in self._stream(query):
+                doc_data = doc.to_dict()
+                index = doc_data['index']
+                if index >= chunk_count:
+                    break
+                offset = start_offset if index == start_index else 0
+                chunk = RecordBatch.unpack(doc_data['data'])
+                if offset:
+                    chunk = chunk.slice(offset, len(chunk))
+                for position, rec in enumerate(chunk, offset + 1):
+                    yield rec, [index, position]
+            return
+        # Análises antigas: um documento por registo, ordenados pelo ID para o cursor ser estável
+        query = upload_ref.collection('records').order_by('__name__')
+        if cursor:
+            query = query.start_after({'__name__': cursor})
+        for doc in self._stream(query):
+            yield doc.to_dict(), doc.id
+
+    def read_records(self, upload_id, upload_data, start_ts=None, end_ts=None):
+        batch = RecordBatch()
+        upload_ref = self._upload_ref(upload_id)
+        if upload_data.get('storageFormat') == 'packed':
+            chunk_count = upload_data.get('chunkCount') or 0
+            if not chunk_count:
+                return batch
+            for doc in self._stream(upload_ref.collection('chunks').order_by('index')):
+                doc_data = doc.to_dict()
+                if doc_data['index'] >= chunk_count:
+                    break
+                chunk = RecordBatch.unpack(doc_data['data'])
+                if start_ts:
+                    chunk = (rec for rec in chunk if in_range(rec, start_ts, end_ts))
+                batch.extend(chunk)
+            return batch
+        for doc in self._stream(upload_ref.collection('records')):
+            rec = doc.to_dict()
+            if start_ts and not in_range(rec, start_ts, end_ts):
+                continue
+            batch.append(rec)
+        return batch
+
+    def read_rollups(self, upload_id):
+        return [doc.to_dict() for doc in self._stream(self._upload_ref(upload_id).collection('rollups'))]
+
+    def purge_size(self, upload_data):
+        # Os chunks nas análises 'packed', um documento por registo nas antigas
+        if upload_data.get('storageFormat') == 'packed':
+            return upload_data.get('chunkCount') or 0
+        return upload_data.get('recordCount') or 0
+
+    def purge_upload(self, upload_id, on_progress=None):
+        upload_ref = self._upload_ref(upload_id)
+        deleted_count = 0
+        with BulkWriter(self.client, max_in_flight=self.max_in_flight) as writer:
+            for subcollection in ('records', 'chunks', 'rollups'):
+                # Basta o ID de cada documento
+                for doc in self._stream(upload_ref.collection(subcollection).select([])):
+                    writer.delete(doc.reference)
+                    deleted_count += 1
+                    if on_progress and deleted_count % PURGE_PROGRESS_EVERY == 0:
+                        on_progress(deleted_count)
+        upload_ref.delete()
+        self._count_single_write('delete')
+        return deleted_count
+
+
+class SQLiteStorage(UploadStorage):
+    """Armazenamento local num ficheiro SQLite (ou em memória, com ':memory:').
+
+    Uma linha por registo, com índices por análise + ordem de gravação e por análise + timestamp;
+    as análises são indexadas por utilizador + createdAt. Uma única ligação partilhada entre threads,
+    protegida por um lock.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS uploads (
+            upload_id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_uploads_user_created ON uploads (user_id, created_at DESC);
+        CREATE TABLE IF NOT EXISTS records (
+            id INTEGER PRIMARY KEY,
+            upload_id TEXT NOT NULL,
+            {columns}
+        );
+        CREATE INDEX IF NOT EXISTS idx_records_upload ON records (upload_id, id);
+        CREATE INDEX IF NOT EXISTS idx_records_upload_timestamp ON records (upload_id, timestamp);
+        CREATE TABLE IF NOT EXISTS rollups (
+            upload_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (upload_id, position)
+        );
+    """.format(columns=',\n            '.join(f"{field} TEXT" for field in FIELDS))
+    PAGE_ROWS = 1000
+    PURGE_ROWS = 10000
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(self.SCHEMA)
+        self._columns = ', '.join(FIELDS)
+
+    def create_upload(self, metadata, batch, rollups):
+        upload_id = uuid.uuid4().hex[:20]
+        created_at = datetime.now(timezone.utc).isoformat()
+        data = dict(metadata, createdAt=created_at, storageFormat='sqlite', hasRollups=True)
+        rows = ((upload_id,) + row for row in zip(*(batch.column(field) for field in FIELDS)))
+        with self._lock, self._conn:
+            self._conn.execute('INSERT INTO uploads (upload_id, user_id, created_at, data) VALUES (?, ?, ?, ?)',
+                               (upload_id, metadata['userId'], created_at, json.dumps(data)))
+            self._conn.executemany(f"INSERT INTO records (upload_id, {self._columns}) VALUES (?{', ?' * len(FIELDS)})", rows)
+            self._conn.executemany('INSERT INTO rollups (upload_id, position, data) VALUES (?, ?, ?)',
+                                   ((upload_id, index, json.dumps(rollup)) for index, rollup in enumerate(rollups)))
+        return upload_id
+
+    def get_upload(self, upload_id):
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM uploads WHERE upload_id = ?', (upload_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_uploads(self, user_id):
+        with self._lock:
+            rows = self._conn.execute('SELECT upload_id, data FROM uploads WHERE user_id = ? ORDER BY created_at DESC', (user_id,)).fetchall()
+        return [(upload_id, json.loads(data)) for upload_id, data in rows]
+
+    def list_uploads_page(self, user_id, fields, page_size, cursor=None):
+        columns = ', '.join(f"json_extract(data, '$.{field}')" for field in fields)
+        sql = f'SELECT upload_id, created_at, {columns} FROM uploads WHERE user_id = ?'
+        params = [user_id]
+        if cursor:
+            sql += ' AND (created_at, upload_id) < (?, ?)'
+            params += list(cursor)
+        sql += ' ORDER BY created_at DESC, upload_id DESC LIMIT ?'
+        with self._lock:
+            rows = self._conn.execute(sql, params + [page_size + 1]).fetchall()
+        next_cursor = [rows[page_size - 1][1], rows[page_size - 1][0]] if len(rows) > page_size else None
+        return [(row[0], dict(zip(fields, row[2:]))) for row in rows[:page_size]], next_cursor
+
+    def _merge_data(self, upload_id, fields):
+        # Chamado dentro de uma transação já aberta
+        row = self._conn.execute('SELECT data FROM uploads WHERE upload_id = ?', (upload_id,)).fetchone()
+        if row is None:
+            raise KeyError(upload_id)
+        data = json.loads(row[0])
+        data.update(fields)
+        self._conn.execute('UPDATE uploads SET data = ? WHERE upload_id = ?', (json.dumps(data), upload_id))
+
+    def update_upload(self, upload_id, fields):
+        with self._lock, self._conn:
+            self._merge_data(upload_id, fields)
+
+    def append_records(self, upload_id, upload_data, batch, rollups, fields):
+        rows = ((upload_id,) + row for row in zip(*(batch.column(field) for field in FIELDS)))
+        with self._lock, self._conn:
+            # BEGIN IMMEDIATE bloqueia a escrita de outros processos até ao fim: a versão verificada aqui é a que fica
+            self._conn.execute('BEGIN IMMEDIATE')
+            row = self._conn.execute('SELECT data FROM uploads WHERE upload_id = ?', (upload_id,)).fetchone()
+            if row is None or (json.loads(row[0]).get('version') or 1) != (upload_data.get('version') or 1):
+                raise AppendConflict(upload_id)
+            self._conn.executemany(f"INSERT INTO records (upload_id, {self._columns}) VALUES (?{', ?' * len(FIELDS)})", rows)
+            if rollups is not None:
+                self._conn.execute('DELETE FROM rollups WHERE upload_id = ?', (upload_id,))
+                self._conn.executemany('INSERT INTO rollups (upload_id, position, data) VALUES (?, ?, ?)',
+                                       ((upload_id, index, json.dumps(rollup)) for index, rollup in enumerate(rollups)))
+            self._merge_data(upload_id, fields)
+
+    def valid_cursor(self, upload_data, position):
+        # ID (rowid) do último registo lido
+        return isinstance(position, int) and not isinstance(position, bool) and position >= 0
+
+    def iter_records(self, upload_id, upload_data, cursor=None):
+        last_id = cursor or 0
+        while True:
+            # Páginas por chave (id > último lido), para não segurar o lock durante toda a leitura
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT id, {self._columns} FROM records WHERE upload_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (upload_id, last_id, self.PAGE_ROWS)).fetchall()
+            for row in rows:
+                last_id = row[0]
+                yield dict(zip(FIELDS, row[1:])), last_id
+            if len(rows) < self.PAGE_ROWS:
+                return
+
+    def read_records(self, upload_id, upload_data, start_ts=None, end_ts=None):
+        query = f"SELECT {self._columns} FROM records WHERE upload_id = ?"
+        params = [upload_id]
+        if start_ts:
+            query += ' AND timestamp BETWEEN ? AND ?'
+            params += [start_ts, end_ts]
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY id', params).fetchall()
+        batch = RecordBatch()
+        for row in rows:
+            batch.append(dict(zip(FIELDS, row)))
+        return batch
+
+    def read_rollups(self, upload_id):
+        with self._lock:
+            rows = self._conn.execute('SELECT data FROM rollups WHERE upload_id = ? ORDER BY position', (upload_id,)).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def purge_size(self, upload_data):
+        return upload_data.get('recordCount') or 0
+
+    def purge_upload(self, upload_id, on_progress=None):
+        deleted_count = 0
+        while True:
+            # Em blocos, para que outras leituras possam passar entre eles
+            with self._lock, self._conn:
+                deleted = self._conn.execute(
+                    'DELETE FROM records WHERE id IN (SELECT id FROM records WHERE upload_id = ? LIMIT ?)',
+                    (upload_id, self.PURGE_ROWS)).rowcount
+            deleted_count += deleted
+            if deleted < self.PURGE_ROWS:
+                break
+            if on_progress:
+                on_progress(deleted_count)
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM rollups WHERE upload_id = ?', (upload_id,))
+            self._conn.execute('DELETE FROM uploads WHERE upload_id = ?', (upload_id,))
+        return deleted_count
+
+
+def create_storage(firestore_client=None, backend=STORAGE_BACKEND):
+    """Armazenamento configurado em STORAGE_BACKEND; None se o Firestore for pedido mas não estiver disponível."""
+    if backend == 'sqlite':
+        return SQLiteStorage(SQLITE_PATH)
+    if backend == 'firestore':
+        return FirestoreStorage(firestore_client) if firestore_client is not None else None
+    raise ValueError(f"STORAGE_BACKEND desconhecido: {backend}")
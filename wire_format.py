@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import calendar
+import functools
+import gzip
+import json
+
+from flight_records import FIELDS, RecordBatch
+
+# Formato compacto (opcional) das respostas com registos: uma coluna por campo em vez de um objeto por
+# registo. As colunas de texto vão codificadas por dicionário (valores distintos + códigos) e o timestamp
+# em minutos desde a época (base + deslocamentos). O corpo segue comprimido com gzip (ou brotli, se o
+# módulo estiver instalado e o cliente o aceitar). Pede-se com o cabeçalho Accept ou com ?encoding=compact;
+# o descodificador em templates/index.html (decodeRecords) reconstrói os mesmos objetos do formato normal.
+COMPACT_MEDIA_TYPE = 'application/vnd.trafego.columnar+json'
+COMPACT_FORMAT_VERSION = 1
+# Corpos mais pequenos do que isto não são comprimidos
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def wants_compact(request):
+    if request.args.get('encoding') == 'compact':
+        return True
+    return any(mimetype == COMPACT_MEDIA_TYPE for mimetype, _ in request.accept_mimetypes)
+
+
+def _epoch_minute(ts):
+    # 'YYYY-MM-DDTHH:MM:00Z' (o formato do parser) -> minutos desde 1970-01-01; None para qualquer outro texto
+    if not isinstance(ts, str) or len(ts) != 20 or ts[4] != '-' or ts[10] != 'T' or not ts.endswith(':00Z'):
+        return None
+    try:
+        seconds = calendar.timegm((int(ts[0:4]), int(ts[5:7]), int(ts[8:10]), int(ts[11:13]), int(ts[14:16]), 0))
+    except ValueError:
+        return None
+    return seconds // 60
+
+
+def _dictionary_column(values, codes):
+    return {'values': values, 'codes': codes.tolist()}
+
+
+def _timestamp_column(values, codes):
+    minutes = [None if value is None else _epoch_minute(value) for value in values]
+    if any(m is None and value is not None for m, value in zip(minutes, values)):
+        # Algum timestamp fora do formato do parser: a coluna segue como texto, sem perder informação
+        return _dictionary_column(values, codes)
+    known = [m for m in minutes if m is not None]
+    base = min(known) if known else 0
+    offsets = [None if m is None else m - base for m in minutes]
+    return {'base': base, 'offsets': [offsets[code] for code in codes]}
+
+
+def encode_batch(records):
+    """Registos (RecordBatch ou lista de dicionários) no formato colunar compacto."""
+    batch = records if isinstance(records, RecordBatch) else RecordBatch(records)
+    columns = {}
+    for field in FIELDS:
+        encode = _timestamp_column if field == 'timestamp' else _dictionary_column
+        columns[field] = encode(batch.distinct(field), batch.codes(field))
+    return {'format': 'columnar', 'version': COMPACT_FORMAT_VERSION, 'count': len(batch), 'fields': list(FIELDS), 'columns': columns}
+
+
+@functools.lru_cache(maxsize=None)
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def preferred_encoding(accept_encoding):
+    """'br', 'gzip' ou None: a compressão que compact_response usa para este Accept-Encoding."""
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if 'br' in accepted and _brotli() is not None:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body, accept_encoding):
+    """(corpo, Content-Encoding) com o melhor algoritmo aceite pelo cliente; sem compressão devolve (body, None).
+
+    O resultado só depende do corpo e do cabeçalho (o gzip não leva data), por isso serve para ETags fortes.
+    """
+    encoding = preferred_encoding(accept_encoding)
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == 'br':
+        return _brotli().compress(body, quality=BROTLI_QUALITY), 'br'
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), 'gzip'
+
+
+def compact_response(payload, request, status=200):
+    """Resposta Flask com o payload em JSON compacto, comprimido conforme o Accept-Encoding do pedido."""
+    from flask import Response
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    body, encoding = compress(body, request.headers.get('Accept-Encoding'))
+    response = Response(body, status=status, mimetype=COMPACT_MEDIA_TYPE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept, Accept-Encoding'
+    return response